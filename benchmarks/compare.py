@@ -0,0 +1,47 @@
+"""
+Порівняння двох файлів результатів benchmarks.run.
+
+    python -m benchmarks.compare base.json new.json [--threshold 1.1]
+
+Для кожної пари (бенчмарк, розмір) виводиться відношення часу new/base;
+якщо хоча б одне перевищує поріг, скрипт завершується з кодом 1.
+"""
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path, encoding='utf-8') as file:
+        report = json.load(file)
+    return report['meta'], {(row['name'], row['size']): row for row in report['results']}
+
+
+def compare(base, new, threshold=1.1):
+    regressions = []
+    for key in sorted(base.keys() & new.keys()):
+        ratio = new[key]['seconds'] / base[key]['seconds'] if base[key]['seconds'] else float('inf')
+        mark = 'ПОВІЛЬНІШЕ' if ratio > threshold else ('швидше' if ratio < 1 / threshold else '')
+        print(f'{key[0]:28} {key[1]:>10} {base[key]["seconds"] * 1000:12.2f} мс '
+              f'{new[key]["seconds"] * 1000:12.2f} мс {ratio:7.2f}x {mark}')
+        if ratio > threshold:
+            regressions.append(key)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('base')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=1.1, help='допустиме відношення new/base')
+    args = parser.parse_args()
+
+    base_meta, base = load(args.base)
+    new_meta, new = load(args.new)
+    print(f'base: {base_meta.get("commit")}  new: {new_meta.get("commit")}')
+    if compare(base, new, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
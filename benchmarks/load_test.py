@@ -0,0 +1,146 @@
+"""
+Навантажувальний тест локального API (tech_sage serve).
+
+Відкриває --concurrency keep-alive з'єднань і протягом --duration секунд
+надсилає змішане навантаження: пошук, query, дні народження, читання
+контакту та (з --writes) створення/видалення. Виводить запитів за
+секунду, p50/p99 затримки та кількість помилок.
+
+Пошук ?term= - повний перегляд книги у потоці, що тримає GIL, і на
+великих книгах саме він визначає результат (20 тис. контактів: близько
+40 запитів/с, p99 понад 1 с); решта запитів відповідає індексом.
+
+    python -m benchmarks.load_test [--url http://127.0.0.1:8080] [--concurrency 50] [--duration 10]
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from urllib.parse import quote, urlsplit
+
+from tech_sage.exchange import record_to_row
+
+from .synthetic import generate_records
+
+READS = [
+    lambda rnd, names: f'/contacts?term={rnd.choice("abcdefghij")}&limit=20',
+    lambda rnd, names: f'/query?q={quote(f"phone:0{rnd.randint(50, 99)}*")}&limit=20',
+    lambda rnd, names: '/birthdays?days=7',
+    lambda rnd, names: f'/contacts/{quote(rnd.choice(names))}' if names else '/contacts?limit=1',
+]
+
+
+async def request(reader, writer, host, method, path, body=None):
+    payload = json.dumps(body).encode('utf-8') if body is not None else b''
+    writer.write(f'{method} {path} HTTP/1.1\r\nHost: {host}\r\n'
+                 f'Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n'.encode('latin-1')
+                 + payload)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        key, _, value = line.decode('latin-1').partition(':')
+        if key.strip().lower() == 'content-length':
+            length = int(value)
+    data = await reader.readexactly(length)
+    return status, data
+
+
+async def client(number, url, deadline, writes, names, latencies, errors):
+    rnd = random.Random(number)
+    reader, writer = await asyncio.open_connection(url.hostname, url.port or 80)
+    created = 0
+    try:
+        while time.perf_counter() < deadline:
+            if writes and rnd.random() < writes:
+                created += 1
+                name = f'Load {number} {created}'
+                calls = [('POST', '/contacts', {'name': name, 'phones': ['0501234567']}),
+                         ('DELETE', f'/contacts/{quote(name)}', None)]
+            else:
+                calls = [('GET', rnd.choice(READS)(rnd, names), None)]
+            for method, path, body in calls:
+                start = time.perf_counter()
+                status, _ = await request(reader, writer, url.netloc, method, path, body)
+                latencies.append(time.perf_counter() - start)
+                if status >= 400 and status != 404:
+                    errors.append(status)
+    finally:
+        writer.close()
+
+
+async def sample_names(url, count=200):
+    reader, writer = await asyncio.open_connection(url.hostname, url.port or 80)
+    try:
+        _, data = await request(reader, writer, url.netloc, 'GET', f'/contacts?limit={count}')
+    finally:
+        writer.close()
+    return [row['name'] for row in json.loads(data)]
+
+
+async def seed(url, size):
+    """Заповнює книгу синтетичними контактами через /batch."""
+    reader, writer = await asyncio.open_connection(url.hostname, url.port or 80)
+    try:
+        batch = []
+        for record in generate_records(size):
+            batch.append({'method': 'POST', 'path': '/contacts', 'body': record_to_row(record)})
+            if len(batch) == 500:
+                await request(reader, writer, url.netloc, 'POST', '/batch', batch)
+                batch = []
+        if batch:
+            await request(reader, writer, url.netloc, 'POST', '/batch', batch)
+    finally:
+        writer.close()
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+async def run(args):
+    url = urlsplit(args.url)
+    if args.seed:
+        await seed(url, args.seed)
+    names = await sample_names(url)
+    latencies, errors = [], []
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(*(client(number, url, deadline, args.writes, names, latencies, errors)
+                           for number in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'seconds': round(elapsed, 3),
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Навантажувальний тест tech_sage serve')
+    parser.add_argument('--url', default='http://127.0.0.1:8080')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=10.0, help='секунд')
+    parser.add_argument('--writes', type=float, default=0.0, help='частка запитів-записів, 0..1')
+    parser.add_argument('--seed', type=int, default=0, help='спершу додати N синтетичних контактів')
+    parser.add_argument('--out', help='записати результат у JSON-файл')
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print(f"{result['requests']} запитів за {result['seconds']} с: {result['rps']} запитів/с, "
+          f"p50 {result['p50_ms']} мс, p99 {result['p99_ms']} мс, помилок {result['errors']}")
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as stream:
+            json.dump(result, stream, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
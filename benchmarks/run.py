@@ -0,0 +1,266 @@
+"""
+Запуск бенчмарків гарячих шляхів tech_sage на синтетичних даних.
+
+    python -m benchmarks.run --sizes 10000 100000 --repeat 3 --out results.json
+    python -m benchmarks.run --only book.find_by_term sort_files.survey
+
+Для кожного розміру книги генерується детермінована книга (--seed),
+кожен бенчмарк виконується --repeat разів і береться найкращий час.
+Результати пишуться у JSON разом з комітом, версією Python і платформою,
+щоб їх можна було порівняти скриптом benchmarks.compare.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from tech_sage import sort_files
+from tech_sage.main import AddressBook, Controller
+from tech_sage.normalize_for_sort import normalize
+from tech_sage.render import RowCache
+from tech_sage.sharded_book import ShardedAddressBook
+
+from .synthetic import generate_book, generate_tree, FILE_WORDS
+
+BENCHMARKS = {}
+SEARCH_TERMS = ('067', 'ivan', 'gmail', 'Kyiv', 'zzz')
+
+
+def benchmark(name):
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+class Context:
+    """Спільні для бенчмарків дані одного розміру: книга генерується один раз."""
+
+    def __init__(self, size, seed, workdir, files):
+        self.size = size
+        self.seed = seed
+        self.workdir = Path(workdir)
+        self.files = files
+        self._book = None
+        self._sharded = None
+
+    @property
+    def book(self):
+        if self._book is None:
+            self._book = generate_book(self.size, self.seed, self.workdir / f'book_{self.size}.pkl')
+        return self._book
+
+    @property
+    def sharded(self):
+        if self._sharded is None:
+            self._sharded = ShardedAddressBook(self.workdir / f'book_{self.size}.shards')
+            self._sharded.add_records(list(self.book.data.values()))
+            self._sharded.dump()
+        return self._sharded
+
+
+@contextlib.contextmanager
+def quiet():
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+# кожен бенчмарк повертає (секунди, кількість операцій)
+
+@benchmark('book.add_record')
+def bench_add_records(ctx):
+    records = list(ctx.book.data.values())
+    book = AddressBook(ctx.workdir / 'tmp.pkl')
+    start = time.perf_counter()
+    for record in records:
+        book.add_record(record)
+    return time.perf_counter() - start, len(records)
+
+
+@benchmark('book.find_by_term')
+def bench_find_by_term(ctx):
+    book = ctx.book
+    start = time.perf_counter()
+    for term in SEARCH_TERMS:
+        book.find_by_term(term)
+    return time.perf_counter() - start, len(SEARCH_TERMS)
+
+
+@benchmark('book.find_notes_by_term')
+def bench_find_notes_by_term(ctx):
+    book = ctx.book
+    start = time.perf_counter()
+    for term in ('meeting', 'робота', 'zzz'):
+        book.find_notes_by_term(term)
+    return time.perf_counter() - start, 3
+
+
+def _controller(ctx):
+    controller = Controller.__new__(Controller)
+    controller.book = ctx.book
+    controller.rows = RowCache(enabled=getattr(ctx.book, 'in_memory', True))
+    return controller
+
+
+@benchmark('controller.when')
+def bench_when(ctx):
+    controller = _controller(ctx)
+    with quiet():
+        start = time.perf_counter()
+        controller.do_when('30')
+        seconds = time.perf_counter() - start
+    return seconds, 1
+
+
+def _list_book(ctx, output):
+    controller = _controller(ctx)
+    os.environ['TECH_SAGE_OUTPUT'] = output
+    try:
+        with quiet():
+            controller.do_list_book()   # перший вивід заповнює кеш рядків
+            start = time.perf_counter()
+            controller.do_list_book()
+            seconds = time.perf_counter() - start
+    finally:
+        del os.environ['TECH_SAGE_OUTPUT']
+    return seconds, len(ctx.book.data)
+
+
+@benchmark('controller.list_book.rich')
+def bench_list_book_rich(ctx):
+    return _list_book(ctx, 'rich')
+
+
+@benchmark('controller.list_book.tsv')
+def bench_list_book_tsv(ctx):
+    return _list_book(ctx, 'tsv')
+
+
+@benchmark('book.dump')
+def bench_dump(ctx):
+    start = time.perf_counter()
+    ctx.book.dump()
+    return time.perf_counter() - start, 1
+
+
+@benchmark('book.load')
+def bench_load(ctx):
+    if not ctx.book.file.exists():
+        ctx.book.dump()
+    book = AddressBook(ctx.book.file)
+    start = time.perf_counter()
+    book.load()
+    return time.perf_counter() - start, 1
+
+
+@benchmark('sharded.find_by_term')
+def bench_sharded_find_by_term(ctx):
+    book = ctx.sharded
+    start = time.perf_counter()
+    for term in SEARCH_TERMS:
+        book.find_by_term(term)
+    return time.perf_counter() - start, len(SEARCH_TERMS)
+
+
+@benchmark('sharded.load')
+def bench_sharded_load(ctx):
+    book = ShardedAddressBook(ctx.sharded.file)
+    start = time.perf_counter()
+    book.load()
+    return time.perf_counter() - start, 1
+
+
+@benchmark('normalize')
+def bench_normalize(ctx):
+    names = [f'{FILE_WORDS[idx % len(FILE_WORDS)]} №{idx} (копія)' for idx in range(ctx.size)]
+    start = time.perf_counter()
+    for name in names:
+        normalize(name)
+    return time.perf_counter() - start, len(names)
+
+
+def _fresh_tree(ctx):
+    root = ctx.workdir / 'tree'
+    shutil.rmtree(root, ignore_errors=True)
+    generate_tree(root, ctx.files, ctx.seed)
+    sort_files.all_files.clear()
+    sort_files.PATH = root
+    return root
+
+
+@benchmark('sort_files.survey')
+def bench_sort_survey(ctx):
+    root = _fresh_tree(ctx)
+    start = time.perf_counter()
+    sort_files.sorting(root)
+    return time.perf_counter() - start, ctx.files
+
+
+@benchmark('sort_files.sort')
+def bench_sort(ctx):
+    root = _fresh_tree(ctx)
+    with quiet():
+        start = time.perf_counter()
+        sort_files.work_with_directories(root, 'new')
+        sort_files.sorting(root, action=True)
+        sort_files.work_with_directories(root, 'del')
+        seconds = time.perf_counter() - start
+    return seconds, ctx.files
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, repeat=3, seed=0, files=1000, only=None):
+    results = []
+    names = [name for name in BENCHMARKS if not only or name in only]
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            ctx = Context(size, seed, workdir, files)
+            for name in names:
+                timings = [BENCHMARKS[name](ctx) for _ in range(repeat)]
+                seconds, ops = min(timings)
+                results.append({'name': name, 'size': size, 'seconds': seconds, 'ops': ops,
+                                'ops_per_sec': ops / seconds if seconds else None})
+                print(f'{name:28} {size:>10} {seconds * 1000:12.2f} мс {ops / seconds if seconds else 0:14.0f} оп/с')
+    return {'meta': {'created': datetime.now().isoformat(timespec='seconds'),
+                     'commit': git_commit(),
+                     'python': platform.python_version(),
+                     'platform': platform.platform(),
+                     'seed': seed, 'repeat': repeat, 'files': files},
+            'results': results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000], help='розміри книги (кількість контактів)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--files', type=int, default=1000, help='кількість файлів для sort_files')
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help='запустити лише ці бенчмарки')
+    parser.add_argument('--out', help='файл для результатів у JSON')
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.repeat, args.seed, args.files, args.only)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        print(f'Результати записані у {args.out}')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""
+Регресійний бенчмарк запуску: час до першого запиту команди.
+
+Запускає у окремому процесі tech_sage.main.startup() (усе, що відбувається
+до першого prompt) на порожній книзі або на книзі з --book, бере медіану
+кількох запусків і завершується з кодом 1, якщо вона перевищує бюджет.
+Додатково показує найповільніші імпорти з python -X importtime.
+
+    python benchmarks/startup.py [--budget 0.5] [--runs 5] [--book path]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BUDGET = 0.5  # секунд
+
+STARTUP_CODE = 'from tech_sage.main import startup; startup()'
+
+
+def _env(book=None):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(ROOT), env.get('PYTHONPATH')]))
+    if book:
+        env['TECH_SAGE_BOOK'] = str(Path(book).resolve())
+    return env
+
+
+def time_to_first_prompt(runs=5, book=None):
+    timings = []
+    with tempfile.TemporaryDirectory() as cwd:
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, '-c', STARTUP_CODE], cwd=cwd, env=_env(book),
+                           stdout=subprocess.DEVNULL, check=True)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def import_times(module='tech_sage.main', top=10):
+    """Повертає [(cumulative us, self us, модуль)] найдовших імпортів."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            env=_env(), stderr=subprocess.PIPE, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--budget', type=float, default=BUDGET, help='бюджет у секундах')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--book', help='файл книги для запуску (за замовчуванням порожня книга)')
+    args = parser.parse_args()
+
+    print('Найдовші імпорти tech_sage.main (мс, cumulative / self):')
+    for cumulative_us, self_us, name in import_times():
+        print(f'{cumulative_us / 1000:9.1f} {self_us / 1000:9.1f}  {name}')
+
+    timings = time_to_first_prompt(args.runs, args.book)
+    median = statistics.median(timings)
+    print(f'\nЧас до першого запиту: медіана {median * 1000:.0f} мс, '
+          f'мін {min(timings) * 1000:.0f} мс, бюджет {args.budget * 1000:.0f} мс')
+    if median > args.budget:
+        print('Перевищено бюджет часу запуску!')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
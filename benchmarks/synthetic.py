@@ -0,0 +1,108 @@
+"""
+Детерміновані синтетичні дані для бенчмарків.
+
+generate_records(n, seed) - генератор контактів з телефонами, e-mail,
+адресами, днями народження та нотатками; однаковий seed дає однакові дані.
+generate_book(n, seed) - AddressBook з n такими контактами.
+generate_tree(root, n_files, seed) - дерево папок з файлами різних типів
+(у тому числі з кириличними іменами) для sort_files.
+"""
+import io
+import random
+import tarfile
+import zipfile
+from datetime import date, timedelta
+from pathlib import Path
+
+from tech_sage.main import AddressBook, NoteRecord
+
+FIRST_NAMES = ('Ivan', 'Petro', 'Olena', 'Maria', 'Andrii', 'Oksana', 'Taras', 'Iryna',
+               'Dmytro', 'Natalia', 'Serhii', 'Yulia', 'Олег', 'Галина', 'Богдан', 'Софія')
+LAST_NAMES = ('Shevchenko', 'Kovalenko', 'Bondarenko', 'Tkachenko', 'Kravchenko', 'Oliinyk',
+              'Melnyk', 'Boiko', 'Шевчук', 'Поліщук', 'Коваль', 'Лисенко')
+STREETS = ('Khreshchatyk', 'Sumska', 'Deribasivska', 'Shevchenka', 'Франка', 'Лесі Українки')
+CITIES = ('Kyiv', 'Kharkiv', 'Odesa', 'Lviv', 'Dnipro')
+DOMAINS = ('gmail.com', 'ukr.net', 'i.ua', 'meta.ua')
+OPERATORS = ('050', '063', '066', '067', '068', '073', '093', '095', '096', '097', '098', '099')
+WORDS = ('meeting', 'call', 'birthday', 'project', 'зустріч', 'подарунок', 'review', 'deadline',
+         'coffee', 'family', 'робота', 'travel')
+TAGS = ('work', 'family', 'friends', 'urgent', 'робота', 'спорт')
+
+EXTENSIONS = ('jpg', 'png', 'jpeg', 'svg', 'avi', 'mp4', 'mov', 'mkv', 'mp3', 'ogg', 'wav', 'amr',
+              'doc', 'docx', 'txt', 'pdf', 'xlsx', 'pptx', 'zip', 'tar', 'py', 'json', '')
+FILE_WORDS = ('звіт', 'фото', 'report', 'photo', 'song', 'пісня', 'Відео', 'draft', 'final (1)', 'копія')
+
+FIRST_BIRTHDAY = date(1950, 1, 1)
+BIRTHDAY_RANGE = (date(2005, 12, 31) - FIRST_BIRTHDAY).days
+
+
+def generate_records(n, seed=0):
+    rnd = random.Random(seed)
+    for idx in range(n):
+        first, last = rnd.choice(FIRST_NAMES), rnd.choice(LAST_NAMES)
+        record = NoteRecord(f'{first} {last} {idx}')
+        for _ in range(rnd.randint(1, 3)):
+            record.add_phone(f'{rnd.choice(OPERATORS)}{rnd.randrange(10 ** 7):07d}')
+        if rnd.random() < 0.8:
+            record.add_email(f'{first.lower()}.{last.lower()}{idx}@{rnd.choice(DOMAINS)}'
+                             if first.isascii() and last.isascii() else f'user{idx}@{rnd.choice(DOMAINS)}')
+        if rnd.random() < 0.6:
+            record.add_address(f'{rnd.choice(CITIES)}, {rnd.choice(STREETS)} {rnd.randint(1, 200)}')
+        if rnd.random() < 0.9:
+            record.add_birthday((FIRST_BIRTHDAY + timedelta(days=rnd.randrange(BIRTHDAY_RANGE))).isoformat())
+        for _ in range(rnd.choice((0, 0, 1, 1, 2, 3))):
+            record.add_note(' '.join(rnd.choices(WORDS, k=rnd.randint(2, 8))), ', '.join(rnd.sample(TAGS, 2)))
+            record.notes[-1].date = '2023-01-01 12:00:00'
+        yield record
+
+
+def generate_book(n, seed=0, file='benchmark_book.pkl'):
+    book = AddressBook(file)
+    batch = []
+    for record in generate_records(n, seed):
+        batch.append(record)
+        if len(batch) >= 10000:
+            book.add_records(batch)
+            batch = []
+    book.add_records(batch)
+    return book
+
+
+def generate_tree(root, n_files, seed=0, depth=3, max_size=4096):
+    """Створює у root n_files файлів у вкладених папках. Повертає загальний розмір у байтах."""
+    rnd = random.Random(seed)
+    root = Path(root)
+    dirs = [root]
+    for idx in range(max(1, n_files // 20)):
+        parent = rnd.choice(dirs)
+        if len(parent.relative_to(root).parts) < depth:
+            child = parent / f'{rnd.choice(FILE_WORDS)} {idx}'
+            child.mkdir(parents=True, exist_ok=True)
+            dirs.append(child)
+    root.mkdir(parents=True, exist_ok=True)
+    total = 0
+    for idx in range(n_files):
+        ext = rnd.choice(EXTENSIONS)
+        name = f'{rnd.choice(FILE_WORDS)}_{idx}' + (f'.{ext}' if ext else '')
+        content = _file_content(rnd, ext, rnd.randint(0, max_size))
+        (rnd.choice(dirs) / name).write_bytes(content)
+        total += len(content)
+    return total
+
+
+def _file_content(rnd, ext, size):
+    # архіви мають бути справжніми, бо sort_files їх розпаковує
+    payload = rnd.randbytes(size)
+    buffer = io.BytesIO()
+    if ext == 'zip':
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            archive.writestr(zipfile.ZipInfo('data.bin', (1980, 1, 1, 0, 0, 0)), payload)
+    elif ext == 'tar':
+        with tarfile.open(fileobj=buffer, mode='w') as archive:
+            info = tarfile.TarInfo('data.bin')
+            info.size = size
+            info.mtime = 0
+            archive.addfile(info, io.BytesIO(payload))
+    else:
+        return payload
+    return buffer.getvalue()
@@ -18,6 +18,6 @@ setup(
     "License :: OSI Approved :: MIT License",
     "Operating System :: OS Independent",
 ],
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks', 'benchmarks.*']),
     entry_points={'console_scripts': ['tech_sage=tech_sage.main:main']} 
 )
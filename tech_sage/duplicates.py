@@ -0,0 +1,159 @@
+"""
+Пошук та об'єднання дублікатів контактів.
+
+Замість порівняння кожної пари записів (O(N²)) записи розкладаються
+по блоках за ключами: нормалізований телефон, локальна частина e-mail,
+фонетичний ключ імені (Soundex після транслітерації). Порівнюються
+лише пари всередині одного блоку, тому пошук майже лінійний.
+У завеликих блоках (поширені імена, спільний телефон офісу) записи
+сортуються за нормалізованим ім'ям і кожен порівнюється лише з WINDOW
+наступними сусідами - перестановки слів імені опиняються поруч.
+"""
+import re
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+from .main import NoteRecord
+from .metrics import METRICS
+from .normalize_for_sort import DICT_TRANSLATE
+
+THRESHOLD = 0.8
+MAX_BLOCK = 50  # блоки більші за це порівнюються лише у вікні сусідів
+WINDOW = 10
+
+WORD = re.compile(r'[^\W\d_]+')
+
+SOUNDEX = {**dict.fromkeys('bfpv', '1'), **dict.fromkeys('cgjkqsxz', '2'), **dict.fromkeys('dt', '3'),
+           'l': '4', **dict.fromkeys('mn', '5'), 'r': '6'}
+
+
+@lru_cache(maxsize=65536)
+def soundex(word):
+    word = ''.join(letter for letter in word.lower() if letter.isalpha() and letter.isascii())
+    if not word:
+        return ''
+    code, last = word[0], SOUNDEX.get(word[0], '')
+    for letter in word[1:]:
+        digit = SOUNDEX.get(letter, '')
+        if digit and digit != last:
+            code += digit
+        if letter not in 'hw':
+            last = digit
+    return (code + '000')[:4]
+
+
+def name_key(name):
+    """
+    Транслітероване ім'я у нижньому регістрі без цифр та розділових знаків,
+    слова відсортовані: "Petrenko Ivan" == "Ivan Petrenko".
+    """
+    return ' '.join(sorted(WORD.findall(name.translate(DICT_TRANSLATE).lower())))
+
+
+def phonetic_key(key):
+    return ' '.join(sorted(filter(None, (soundex(word) for word in key.split()))))
+
+
+def phone_key(phone):
+    digits = phone if phone.isdigit() else ''.join(c for c in phone if c.isdigit())
+    return digits[-10:]
+
+
+def email_key(email):
+    local = email.lower().split('@', 1)[0]
+    return local.split('+', 1)[0].replace('.', '')
+
+
+class Profile:
+    """Нормалізовані ключі одного запису, обчислюються один раз."""
+
+    def __init__(self, record):
+        self.name = record.name.value
+        self.name_key = name_key(self.name)
+        self.phones = {phone_key(phone.value) for phone in record.phones if phone.value}
+        self.email = email_key(record.email.value) if record.email else None
+
+    def blocking_keys(self):
+        keys = {f'p:{phone}' for phone in self.phones}
+        if self.email:
+            keys.add(f'e:{self.email}')
+        key = phonetic_key(self.name_key)
+        if key:
+            keys.add(f'n:{key}')
+        return keys
+
+
+def score(first, second):
+    """Оцінка схожості двох профілів від 0 до 1 та список причин."""
+    reasons = []
+    similarity = SequenceMatcher(None, first.name_key, second.name_key).ratio()
+    result = similarity
+    if similarity >= 0.5:
+        reasons.append(f"ім'я {similarity:.0%}")
+    if first.phones & second.phones:
+        result += 0.3
+        reasons.append('спільний телефон')
+    if first.email and first.email == second.email:
+        result += 0.3
+        reasons.append('однаковий e-mail')
+    return min(result, 1.0), reasons
+
+
+def candidate_pairs(profiles):
+    blocks = {}
+    for profile in profiles:
+        for key in profile.blocking_keys():
+            blocks.setdefault(key, []).append(profile)
+    pairs = {}
+    for block in blocks.values():
+        if len(block) < 2:
+            continue
+        window = len(block)
+        if len(block) > MAX_BLOCK:
+            block = sorted(block, key=lambda profile: (profile.name_key, profile.name))
+            window = WINDOW
+        for idx, first in enumerate(block):
+            for second in block[idx + 1:idx + 1 + window]:
+                key = (first.name, second.name) if first.name < second.name else (second.name, first.name)
+                pairs.setdefault(key, (first, second))
+    return pairs.values()
+
+
+def find_duplicates(book, threshold=THRESHOLD):
+    """Повертає список (оцінка, ім'я 1, ім'я 2, причини), від найсхожіших."""
+    result = []
+    with METRICS.timed('book.find_duplicates') as timing:
+        profiles = [Profile(record) for record in book.data.values()]
+        timing.records = len(profiles)
+        for first, second in candidate_pairs(profiles):
+            value, reasons = score(first, second)
+            if value >= threshold:
+                result.append((value, first.name, second.name, reasons))
+    result.sort(key=lambda item: (-item[0], item[1], item[2]))
+    return result
+
+
+def merge_records(book, keep_name, other_name):
+    """
+    Переносить телефони, нотатки та відсутні поля запису other_name у keep_name
+    і видаляє other_name. Повертає об'єднаний NoteRecord.
+    """
+    keep, other = book[keep_name], book[other_name]
+    merged = keep if isinstance(keep, NoteRecord) else NoteRecord(keep_name)
+    if merged is not keep:
+        merged.phones = list(keep.phones)
+        merged.email, merged.address, merged.birthday = keep.email, keep.address, keep.birthday
+
+    known = {phone_key(phone.value) for phone in merged.phones}
+    for phone in other.phones:
+        if phone_key(phone.value) not in known:
+            merged.phones.append(phone)
+            known.add(phone_key(phone.value))
+    merged.email = merged.email or other.email
+    merged.address = merged.address or other.address
+    merged.birthday = merged.birthday or other.birthday
+    merged.notes.extend(getattr(other, 'notes', []))
+
+    del book.data[other_name]
+    book.data[keep_name] = merged
+    return merged
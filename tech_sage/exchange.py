@@ -0,0 +1,328 @@
+"""
+Потоковий імпорт та експорт адресної книги.
+
+Підтримувані формати (визначаються за розширенням файлу):
+.csv   - name, phones, email, address, birthday (телефони через ';');
+.jsonl - один JSON-об'єкт на рядок, разом з нотатками;
+.vcf   - vCard 3.0, нотатки зберігаються як NOTE;
+.ics   - лише експорт: iCalendar з щорічною подією для кожного дня народження.
+
+Записи читаються та пишуться генераторами, тому пам'ять не залежить
+від розміру файлу. Кожен рядок перевіряється сеттерами Phone/Email/Birthday,
+помилки збираються по рядках і не переривають імпорт.
+"""
+import csv
+import hashlib
+import json
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .main import NoteRecord, Note
+
+CSV_FIELDS = ['name', 'phones', 'email', 'address', 'birthday']
+FORMATS = ('.csv', '.jsonl', '.vcf')
+EXPORT_FORMATS = FORMATS + ('.ics',)
+BATCH_SIZE = 1000
+MAX_ERRORS = 100
+
+PHONE_SEPARATORS = re.compile(r'[\s\-()+.]')
+
+
+def file_format(path, formats=FORMATS):
+    suffix = Path(path).suffix.lower()
+    if suffix not in formats:
+        raise ValueError(f"Невідомий формат файлу '{suffix}'. Підтримуються: {', '.join(formats)}")
+    return suffix
+
+
+def _tags_to_list(tags):
+    if not tags:
+        return []
+    if isinstance(tags, str):
+        return [tag.strip() for tag in tags.split(',') if tag.strip()]
+    return list(tags)
+
+
+def record_to_row(record):
+    row = {'name': record.name.value,
+           'phones': [phone.value for phone in record.phones],
+           'email': record.email.value if record.email else '',
+           'address': record.address.value if record.address else '',
+           'birthday': record.birthday.value if record.birthday else ''}
+    notes = getattr(record, 'notes', None)
+    if notes:
+        row['notes'] = [{'text': note.value, 'tags': _tags_to_list(note.tags), 'date': note.date}
+                        for note in notes]
+    return row
+
+
+def row_to_record(row):
+    name = str(row.get('name') or '').strip()
+    if not name:
+        raise ValueError("Відсутнє ім'я контакту")
+    record = NoteRecord(name)
+    phones = row.get('phones') or []
+    if isinstance(phones, str):
+        phones = phones.split(';')
+    for phone in phones:
+        phone = PHONE_SEPARATORS.sub('', str(phone))
+        if phone:
+            record.add_phone(phone)
+    if row.get('email'):
+        record.add_email(str(row['email']).strip())
+    if row.get('address'):
+        record.add_address(str(row['address']).strip())
+    if row.get('birthday'):
+        record.add_birthday(str(row['birthday']).strip())
+    for note in row.get('notes') or []:
+        if isinstance(note, str):
+            note = {'text': note}
+        if note.get('text'):
+            record.notes.append(Note(note['text'], note.get('date') or '', _tags_to_list(note.get('tags'))))
+    return record
+
+
+# --- читання: кожен генератор повертає (номер рядка, сирий запис) ---
+
+def _read_csv(file):
+    reader = csv.DictReader(file)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def _parse_csv(row):
+    return {key: (value or '') for key, value in row.items() if key}
+
+
+def _read_jsonl(file):
+    for line_no, line in enumerate(file, start=1):
+        if line.strip():
+            yield line_no, line
+
+
+def _parse_jsonl(line):
+    row = json.loads(line)
+    if not isinstance(row, dict):
+        raise ValueError('Рядок має бути JSON-об\'єктом')
+    return row
+
+
+def _vcard_unescape(value):
+    return value.replace('\\n', '\n').replace('\\N', '\n').replace('\\,', ',').replace('\\;', ';').replace('\\\\', '\\')
+
+
+def _vcard_escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace(',', '\\,').replace(';', '\\;')
+
+
+def _vcard_lines(file):
+    # розгортання "folded" рядків: продовження починається з пробілу або табуляції
+    current, current_no = None, 0
+    for line_no, line in enumerate(file, start=1):
+        line = line.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current_no, current
+        current, current_no = line, line_no
+    if current is not None:
+        yield current_no, current
+
+
+def _read_vcf(file):
+    card, start = None, 0
+    for line_no, line in _vcard_lines(file):
+        upper = line.upper()
+        if upper == 'BEGIN:VCARD':
+            card, start = [], line_no
+        elif upper == 'END:VCARD':
+            if card is not None:
+                yield start, card
+            card = None
+        elif card is not None and ':' in line:
+            card.append(line)
+
+
+def _parse_vcf(card):
+    row = {'phones': [], 'notes': []}
+    for line in card:
+        key, value = line.split(':', 1)
+        prop = key.split(';', 1)[0].upper()
+        if prop == 'FN':
+            row['name'] = _vcard_unescape(value)
+        elif prop == 'TEL':
+            row['phones'].append(value)
+        elif prop == 'EMAIL':
+            row['email'] = value
+        elif prop == 'ADR':
+            parts = [_vcard_unescape(part) for part in re.split(r'(?<!\\);', value)]
+            row['address'] = ', '.join(part for part in parts if part)
+        elif prop == 'BDAY':
+            value = value[:10]
+            if len(value) >= 8 and value[:8].isdigit():
+                value = f'{value[:4]}-{value[4:6]}-{value[6:8]}'
+            row['birthday'] = value
+        elif prop == 'NOTE':
+            row['notes'].append(_vcard_unescape(value))
+    return row
+
+
+READERS = {'.csv': (_read_csv, _parse_csv),
+           '.jsonl': (_read_jsonl, _parse_jsonl),
+           '.vcf': (_read_vcf, _parse_vcf)}
+
+
+def _check_encoding(raw):
+    # raw - рядок (.jsonl), список рядків (.vcf) або словник рядка CSV
+    if isinstance(raw, str):
+        values = [raw]
+    elif isinstance(raw, dict):
+        values = [value for item in raw.items() for value in item]
+        values = [item for value in values for item in (value if isinstance(value, list) else [value])]
+    else:
+        values = raw
+    for value in values:
+        if not isinstance(value, str):
+            continue
+        try:
+            value.encode('utf-8')
+        except UnicodeEncodeError as e:
+            byte = ord(value[e.start]) - 0xdc00
+            raise ValueError(f'Некоректний байт 0x{byte:02x} у кодуванні UTF-8') from None
+
+
+def iter_rows(path):
+    """Генератор (номер рядка, запис або виняток) для файлу імпорту."""
+    read, parse = READERS[file_format(path)]
+    # surrogateescape: некоректні байти UTF-8 не переривають читання файлу,
+    # а дають помилку лише у своєму рядку
+    with open(path, encoding='utf-8', errors='surrogateescape', newline='') as file:
+        for line_no, raw in read(file):
+            try:
+                _check_encoding(raw)
+                yield line_no, row_to_record(parse(raw))
+            except (ValueError, IndexError, KeyError, TypeError, AttributeError) as e:
+                yield line_no, e
+
+
+def import_file(book, path, batch_size=BATCH_SIZE, before_write=None):
+    """
+    Імпортує контакти у книгу пакетами по batch_size записів.
+    before_write() викликається перед записом кожного пакета у книгу.
+    Повертає (кількість імпортованих, кількість помилок, перші MAX_ERRORS помилок).
+    """
+    imported, failed, errors = 0, 0, []
+    batch = []
+    before_write = before_write or (lambda: None)
+    for line_no, result in iter_rows(path):
+        if isinstance(result, Exception):
+            failed += 1
+            if len(errors) < MAX_ERRORS:
+                errors.append((line_no, str(result)))
+            continue
+        batch.append(result)
+        if len(batch) >= batch_size:
+            before_write()
+            book.add_records(batch)
+            imported += len(batch)
+            batch = []
+    if batch:
+        before_write()
+        book.add_records(batch)
+        imported += len(batch)
+    return imported, failed, errors
+
+
+# --- запис ---
+
+def _write_csv(file, records):
+    writer = csv.DictWriter(file, fieldnames=CSV_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    for record in records:
+        row = record_to_row(record)
+        row['phones'] = ';'.join(row['phones'])
+        writer.writerow(row)
+        yield
+
+
+def _write_jsonl(file, records):
+    for record in records:
+        file.write(json.dumps(record_to_row(record), ensure_ascii=False))
+        file.write('\n')
+        yield
+
+
+def _write_vcf(file, records):
+    for record in records:
+        row = record_to_row(record)
+        lines = ['BEGIN:VCARD', 'VERSION:3.0', f"FN:{_vcard_escape(row['name'])}"]
+        lines.extend(f'TEL;TYPE=CELL:{phone}' for phone in row['phones'])
+        if row['email']:
+            lines.append(f"EMAIL:{row['email']}")
+        if row['address']:
+            lines.append(f"ADR:;;{_vcard_escape(row['address'])};;;;")
+        if row['birthday']:
+            lines.append(f"BDAY:{row['birthday']}")
+        lines.extend(f"NOTE:{_vcard_escape(note['text'])}" for note in row.get('notes', []))
+        lines.append('END:VCARD')
+        file.write('\r\n'.join(lines))
+        file.write('\r\n')
+        yield
+
+
+def _ics_fold(line):
+    # рядки iCalendar - не довше 75 октетів, продовження починається з пробілу
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return line
+    parts, start, limit = [], 0, 75
+    while start < len(data):
+        end = min(start + limit, len(data))
+        while end < len(data) and data[end] & 0xc0 == 0x80:    # не розрізаємо символ UTF-8
+            end -= 1
+        parts.append(data[start:end].decode('utf-8'))
+        start, limit = end, 74
+    return '\r\n '.join(parts)
+
+
+def _write_ics(file, records):
+    # подія на весь день (DTSTART;VALUE=DATE) з RRULE, тож календар сам повторює її щороку;
+    # UID залежить лише від імені, тож повторний імпорт оновлює події, а не дублює їх
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    file.write('BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Tech Sage//Birthdays//UK\r\n'
+               'CALSCALE:GREGORIAN\r\nX-WR-CALNAME:Дні народження\r\n')
+    for record in records:
+        if not record.birthday:
+            continue
+        name = record.name.value
+        birthday = record.birthday.value.replace('-', '')
+        rule = 'FREQ=YEARLY'
+        if birthday.endswith('0229'):
+            rule += ';BYMONTH=2;BYMONTHDAY=-1'      # у невисокосні роки - 28 лютого
+        lines = ['BEGIN:VEVENT',
+                 f"UID:{hashlib.sha1(name.encode('utf-8')).hexdigest()[:20]}@tech-sage",
+                 f'DTSTAMP:{stamp}',
+                 f'DTSTART;VALUE=DATE:{birthday}',
+                 f'RRULE:{rule}',
+                 f'SUMMARY:{_vcard_escape(f"День народження: {name}")}',
+                 'TRANSP:TRANSPARENT',
+                 'END:VEVENT']
+        file.write('\r\n'.join(_ics_fold(line) for line in lines))
+        file.write('\r\n')
+        yield
+    file.write('END:VCALENDAR\r\n')
+
+
+WRITERS = {'.csv': _write_csv, '.jsonl': _write_jsonl, '.vcf': _write_vcf, '.ics': _write_ics}
+
+
+def export_file(book, path):
+    """Записує усі контакти книги у файл. Повертає кількість записів (для .ics - подій)."""
+    write = WRITERS[file_format(path, EXPORT_FORMATS)]
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        for _ in write(file, book.data.values()):
+            count += 1
+    return count
@@ -0,0 +1,104 @@
+"""
+Історія змін адресної книги: undo, redo та повернення до моменту часу.
+
+Кожна команда, що змінює книгу, виконується як транзакція:
+begin(label) -> touch(name) перед кожною зміною запису -> commit().
+touch() запам'ятовує копію лише того запису, який змінюється, а commit()
+зберігає пару (до, після) тільки для записів, що дійсно змінились.
+Тому undo/redo/checkout працюють за час, пропорційний зміні, а не
+розміру книги.
+"""
+from copy import deepcopy
+from datetime import datetime
+
+from .main import record_state
+
+HISTORY_LIMIT = 1000
+
+
+class Change:
+    def __init__(self, label, time, before, after):
+        self.label = label
+        self.time = time
+        self.before = before    # ім'я -> копія запису або None (запису не було)
+        self.after = after
+
+    def __str__(self):
+        return f"{self.time:%Y-%m-%d %H:%M:%S} {self.label}: {', '.join(self.after)}"
+
+
+class History:
+    def __init__(self, book, limit=HISTORY_LIMIT):
+        self.book = book
+        self.limit = limit
+        self.undo_stack = []
+        self.redo_stack = []
+        self._label = None
+        self._pending = None
+
+    def begin(self, label):
+        self._label = label
+        self._pending = {}
+
+    def touch(self, name):
+        """Викликається перед зміною запису name."""
+        if self._pending is not None and name not in self._pending:
+            self._pending[name] = deepcopy(self.book.get(name))
+
+    def commit(self):
+        pending, self._pending = self._pending, None
+        if not pending:
+            return None
+        before, after = {}, {}
+        for name, old in pending.items():
+            new = self.book.get(name)
+            if record_state(old) != record_state(new):
+                before[name] = old
+                after[name] = deepcopy(new)
+        if not after:
+            return None
+        change = Change(self._label, datetime.now(), before, after)
+        self.undo_stack.append(change)
+        del self.undo_stack[:-self.limit]
+        self.redo_stack.clear()
+        return change
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+
+    def _apply(self, states):
+        for name, record in states.items():
+            self.book.touch(name)
+            if record is None:
+                if name in self.book:
+                    del self.book.data[name]
+            else:
+                self.book.data[name] = deepcopy(record)
+
+    def undo(self):
+        if not self.undo_stack:
+            return None
+        change = self.undo_stack.pop()
+        self._apply(change.before)
+        self.redo_stack.append(change)
+        return change
+
+    def redo(self):
+        if not self.redo_stack:
+            return None
+        change = self.redo_stack.pop()
+        self._apply(change.after)
+        self.undo_stack.append(change)
+        return change
+
+    def checkout(self, moment):
+        """Повертає книгу у стан на момент moment. Повертає кількість скасованих/повторених змін."""
+        steps = 0
+        while self.undo_stack and self.undo_stack[-1].time > moment:
+            self.undo()
+            steps += 1
+        while self.redo_stack and self.redo_stack[-1].time <= moment:
+            self.redo()
+            steps += 1
+        return steps
@@ -1,22 +1,33 @@
 # tsamsing change
+# важкі модулі (rich, prompt_toolkit, pickle, sort_files) імпортуються при
+# першому використанні, щоб запуск до першого запиту команди був швидким;
+# перевірка: python -X importtime -m tech_sage.main, benchmarks/startup.py
 from collections import UserDict
-from datetime import datetime
-import cmd
-import pickle
+from datetime import datetime, date, timedelta
 from pathlib import Path
 from typing import List
-from abc import ABC, abstractmethod
+import os
 import sys
-from prompt_toolkit import prompt
-from prompt_toolkit.completion import WordCompleter
-from prompt_toolkit.completion import NestedCompleter
-from prompt_toolkit.validation import Validator, ValidationError
-from rich.console import Console
-from rich.table import Table
+import time
 import re
-from .sort_files import run
+from .metrics import METRICS
+
+_console = None
+
+
+def get_console():
+    global _console
+    if _console is None:
+        from rich.console import Console
+        _console = Console()
+    return _console
+
+
+def Table(*args, **kwargs):
+    from rich.table import Table
+    return Table(*args, **kwargs)
+
 
-console = Console()
 COMMANDS = {'add_name': ['add_name', 'Додавання нового контакту у довідник'],
             'add_phone': ['add_phone Name', 'Додавання телефонного номеру до контакту Name.\nКожен контакт може мати кілька номерів'],
             'add_birthday': ['add_birthday Name', 'Додавання для контакта Name дня народження у форматі РРРР-ММ-ДД.\nКожен контакт має тільки один день народження.\nТакож застосовується для зміни дня народження'],
@@ -36,10 +47,25 @@ COMMANDS = {'add_name': ['add_name', 'Додавання нового конта
             'edit_note': ['edit_note Name', 'Коригування нотаток для контакту Name'],
             'delete_all_notes': ['delete_all_notes Name', 'Видалення усіх нотаток для контакту Name'],
 
+            'query': ['query filters', "Пошук за кількома умовами одночасно, напр.:\nquery phone:067* tag:work birthday<30d name~ivan\nПоля: name, phone, email, address, tag, note, birthday; ':' - шаблон, '~' - підрядок.\nlimit:N - кількість результатів, explain - показати план пошуку"],
+            'find_duplicates': ['find_duplicates', 'Пошук можливих дублікатів контактів: схожі імена, спільні телефони або e-mail'],
+            'merge_contacts': ['merge_contacts', "Об'єднання двох контактів: телефони, нотатки та відсутні поля\nдругого контакту переносяться у перший, другий видаляється"],
+
             'days_to_birthday': ['days_to_birthday Name', 'Розрахунок залишку днів до дня народження контакта "Name"'],
             'when': ['when Number', 'Виводить на екран список контактів, у яких день народження впродовж "Number" днів від сьогодні'],
             'sort_files': ['sort_files Path', 'Сортує файли у папці "Path" на вашому диску по папках в залежності від типу файлу'],
 
+            'import': ['import Path', 'Імпорт контактів з файлу Path (.csv, .jsonl, .vcf).\nКонтакти з однаковим ім\'ям перезаписуються'],
+            'export': ['export Path', 'Експорт усіх контактів у файл Path (.csv, .jsonl, .vcf).\nДо .ics експортуються дні народження як щорічні події календаря'],
+
+            'stats': ['stats [Path]', 'Статистика часу виконання команд та операцій з книгою.\nЯкщо вказано Path, метрики також записуються у JSON-файл'],
+            'profile': ['profile command', 'Виконання однієї команди під cProfile та tracemalloc\nз виводом найдорожчих функцій та виділень пам\'яті'],
+
+            'undo': ['undo', 'Скасування останньої зміни у довіднику'],
+            'redo': ['redo', 'Повторення скасованої зміни'],
+            'history': ['history', 'Список останніх змін, які можна скасувати'],
+            'checkout': ['checkout Time', 'Повернення довідника у стан на момент Time (ГГ:ХХ[:СС] або РРРР-ММ-ДД ГГ:ХХ:СС).\nІсторія змін ведеться до наступного load або import'],
+
             'help': ['help', 'Виклик довідника команд, що вміє цей бот'],
             'load': ['load', 'Завантаження довідника з файла на диску. \nПерезапише зміни, що були внесені та не збережені у файл.\nТакож відбувається автоматично при запуску програми'],
             'save': ['save', 'Зберігання змін у довіднику у файл на диску.\nТакож відбувається автоматично при закінченні роботи з програмою'],
@@ -113,6 +139,41 @@ class Birthday(Field):
         self._value = new_value
 
 
+def next_birthday(birthday, today):
+    """Найближча дата дня народження, не раніше today. 29 лютого у невисокосний рік - 28 лютого."""
+    for year in (today.year, today.year + 1):
+        try:
+            candidate = birthday.replace(year=year)
+        except ValueError:
+            candidate = birthday.replace(year=year, day=28)
+        if candidate >= today:
+            return candidate
+
+
+def birthdays_today(book, today=None):
+    """
+    Записи з днем народження сьогодні (29 лютого у невисокосний рік - 28-го).
+    Книга SQLite відповідає індексом місяць/день, не читаючи всі рядки.
+    """
+    today = today or date.today()
+    if not hasattr(book, 'find_by_birthday'):
+        result = []
+        for record in book.values():
+            if not record.birthday:
+                continue
+            try:
+                birthday = date.fromisoformat(record.birthday.value)
+            except ValueError:
+                birthday = datetime.strptime(record.birthday.value, "%Y-%m-%d").date()
+            if next_birthday(birthday, today) == today:
+                result.append(record)
+        return result
+    days = [(today.month, today.day)]
+    if today.month == 2 and today.day == 28 and (today + timedelta(days=1)).month == 3:
+        days.append((2, 29))
+    return [record for month, day in days for record in book.find_by_birthday(month, day)]
+
+
 class Record:
     def __init__(self, name, email=None, address=None, birthday=None):
         self.name = Name(name)
@@ -171,15 +232,21 @@ class Record:
         if not self.birthday:
             return -1
 
-        today = datetime.now().date()
-        next_birthday = datetime.strptime(self.birthday.value, "%Y-%m-%d").date().replace(year=today.year)
-        if today > next_birthday:
-            next_birthday = next_birthday.replace(year=today.year + 1)
-
-        days_until_birthday = (next_birthday - today).days
+        today = date.today()
+        try:
+            birthday = date.fromisoformat(self.birthday.value)
+        except ValueError:
+            birthday = datetime.strptime(self.birthday.value, "%Y-%m-%d").date()
+        days_until_birthday = (next_birthday(birthday, today) - today).days
         return days_until_birthday
 
 
+SQLITE_SUFFIXES = ('.db', '.sqlite', '.sqlite3')
+QUERY_PAGE = 100
+SNAPSHOT_SUFFIX = '.tss'
+SHARDS_SUFFIX = '.shards'
+
+
 class AddressBook(UserDict):
     record_id = None
 
@@ -192,6 +259,15 @@ class AddressBook(UserDict):
     def add_record(self, record):
         self.data[record.name.value] = record
 
+    def touch(self, name):
+        # викликається перед зміною запису name; шардована книга відмічає змінений шард
+        pass
+
+    def add_records(self, records):
+        with METRICS.timed('book.add_records') as timing:
+            self.data.update((record.name.value, record) for record in records)
+            timing.records = len(records)
+
     def find(self, term):
 
         if term in self.data:
@@ -215,18 +291,42 @@ class AddressBook(UserDict):
                 result = []
 
     def dump(self):
-        with open(self.file, "wb") as file:
-            pickle.dump((self.record_id, dict(self.data)), file)
+        with METRICS.timed('book.dump') as timing:
+            if self.file.suffix.lower() == SNAPSHOT_SUFFIX:
+                from .snapshot import dump_snapshot
+                dump_snapshot(self.file, self.data, self.record_id)
+            else:
+                import pickle
+                with open(self.file, "wb") as file:
+                    pickle.dump((self.record_id, dict(self.data)), file)
+            timing.records = len(self.data)
 
     def load(self):
-        if not self.file.exists():
-            return
-        with open(self.file, "rb") as file:
-            self.record_id, data = pickle.load(file)
+        file = self.file
+        if not file.exists():
+            # перехід на знімок: поки .tss ще не збережено, читаємо старий .pkl з тим самим іменем
+            file = file.with_suffix('.pkl')
+            if self.file.suffix.lower() != SNAPSHOT_SUFFIX or not file.exists():
+                return
+        from .snapshot import is_snapshot
+        with METRICS.timed('book.load') as timing:
+            if is_snapshot(file):
+                from .snapshot import load_snapshot
+                self.record_id, data = load_snapshot(file)
+            else:
+                import pickle
+                with open(file, "rb") as stream:
+                    self.record_id, data = pickle.load(stream)
             self.data.update(data)
+            timing.records = len(data)
 
 
     def find_by_term(self, term: str) -> List[Record]:
+        with METRICS.timed('book.find_by_term') as timing:
+            timing.records = len(self.data)
+            return self._find_by_term(term)
+
+    def _find_by_term(self, term):
         matching_records = []
 
         for record in self.data.values():
@@ -241,6 +341,15 @@ class AddressBook(UserDict):
         matching_records.extend(record for record in self.data.values() if term.lower() in record.name.value.lower())
         return matching_records
 
+    def find_notes_by_term(self, term):
+        matching_notes = []
+        with METRICS.timed('book.find_notes_by_term') as timing:
+            timing.records = len(self.data)
+            for name, record in self.data.items():
+                if isinstance(record, NoteRecord):
+                    matching_notes.extend((name, note) for note in record.find_notes_by_term(term))
+        return matching_notes
+
 
 class Note(Field):
     def __init__(self, text, date, tags=None):
@@ -291,33 +400,83 @@ class NoteRecord(Record):
         return f"NoteRecord(name={self.name.value}, notes={notes_str})"
 
 
+def record_state(record):
+    """Незмінне представлення усіх полів запису - для порівняння версій запису."""
+    if record is None:
+        return None
+    return (type(record).__name__,
+            record.name.value,
+            tuple(phone.value for phone in record.phones),
+            record.email.value if record.email else None,
+            record.address.value if record.address else None,
+            record.birthday.value if record.birthday else None,
+            tuple((note.value, note.tags if isinstance(note.tags, str) else tuple(note.tags or ()), note.date)
+                  for note in getattr(record, 'notes', ())))
+
+
+
+
+def open_book(file=None):
+    # файл книги можна задати змінною оточення TECH_SAGE_BOOK;
+    # для .db/.sqlite використовується SQLite, для .tss - колонковий знімок
+    # (tech_sage/snapshot.py), для папки .shards - шарди (tech_sage/sharded_book.py), інакше - pickle
+    file = Path(file or os.environ.get('TECH_SAGE_BOOK', 'adress_book_1.pkl'))
+    if file.suffix.lower() in SQLITE_SUFFIXES:
+        from .sqlite_book import SQLiteAddressBook
+        return SQLiteAddressBook(file)
+    if file.suffix.lower() == SHARDS_SUFFIX:
+        from .sharded_book import ShardedAddressBook
+        return ShardedAddressBook(file)
+    return AddressBook(file)
+
+
 class Controller():
     def __init__(self):
         super().__init__()
-        self.book = AddressBook()
+        from .history import History
+        from .render import RowCache
+        self.book = open_book()
+        self.history = History(self.book)
+        self.rows = RowCache(enabled=getattr(self.book, 'in_memory', True))
+        self._query_index = None
+
+    def _touch(self, name):
+        # викликається перед кожною зміною запису name
+        self.history.touch(name)
+        self.book.touch(name)
+        self._book_changed(name)
+
+    def _book_changed(self, name=None):
+        # скидає все, що обчислено з вмісту книги (name - змінився лише цей запис)
+        self._query_index = None
+        self.rows.invalidate(name)
 
     def do_exit(self):
         self.book.dump()
         print("Адресна книга збережена! Вихід...")
+        self.close()
         return True
 
+    def close(self):
+        # шардована книга тримає пули процесів, sqlite - з'єднання; не лишаємо їх на atexit
+        close = getattr(self.book, 'close', None)
+        if close is not None:
+            close()
+
     def do_save(self):
         self.book.dump()
         print("Адресна книга збережена!")
 
     def do_load(self):
         self.book.load()
+        self.history.clear()
+        self._book_changed()
         print("Адресна книга відновлена")
 
     def do_help(self):
-        table = Table(show_header=True, header_style="bold blue", border_style='bold green')
-        table.add_column('Синтаксис команди')
-        table.add_column('Опис')
-
-        for commands in COMMANDS.values():
-            table.add_row(commands[0], commands[1])
-            table.add_section()
-        console.print(table)
+        from .render import print_table
+        print_table(('Синтаксис команди', 'Опис'), ((command[0], command[1]) for command in COMMANDS.values()),
+                    header_style="bold blue", border_style='bold green')
         print('Після введення команди натисни Enter')
 
     def line_to_name (self, line):
@@ -340,6 +499,7 @@ class Controller():
                 return
             try:
                 record = NoteRecord(name)
+                self._touch(name)
                 self.book.add_record(record)
                 print(f"Контакт з ім'ям '{name}' успішно створено.")
                 break
@@ -358,6 +518,7 @@ class Controller():
                 return
             try:
                 record = NoteRecord(name)
+                self._touch(name)
                 self.book.delete_record(record)
                 print(f"Контакт з ім'ям '{name}' успішно видалено.")
                 break
@@ -373,6 +534,7 @@ class Controller():
             return
         phone = input ('Введіть номер телефону: 10 цифр:  ')
 
+        self._touch(name)
         try:
             record.add_phone(phone)
             print(f"Телефон '{phone}' додано до контакта '{name}'.")
@@ -388,6 +550,7 @@ class Controller():
             return
         phone = input ('Введіть номер телефону: 10 цифр:  ')
 
+        self._touch(name)
         try:
             record.remove_phone(phone)
         except ValueError as e:
@@ -401,6 +564,7 @@ class Controller():
             print(f"Контакт з ім'ям '{name}' не знайдено.")
             return
         birthday_str = input ('Введіть дату дня народження у форматі РРРР-ММ-ДД:  ')
+        self._touch(name)
         try:
             record.add_birthday(birthday_str)
             print(f"День народження {birthday_str} додано для контакта '{name}'.")
@@ -414,6 +578,7 @@ class Controller():
             print(f"Контакт з ім'ям '{name}' не знайдено.")
             return
         email = input('Введіть email:  ')
+        self._touch(name)
         try:
             record.add_email(email)
             print(f"Email '{email}' додано до контакта '{name}'.")
@@ -426,6 +591,7 @@ class Controller():
         if not record:
             print(f"Контакт з ім'ям '{name}' не знайдено.")
             return
+        self._touch(name)
         try:
             record.delete_email()
             print(f"E-mail контакта '{name}' видалено.")
@@ -439,6 +605,7 @@ class Controller():
             print(f"Контакт з ім'ям '{name}' не знайдено.")
             return
         address = input('Введіть адресу: ')
+        self._touch(name)
         try:
             record.add_address(address)
             print(f"Адреса '{address}' додана до контакта '{name}'.")
@@ -451,6 +618,7 @@ class Controller():
         if not record:
             print(f"Контакт з ім'ям '{name}' не знайдено.")
             return
+        self._touch(name)
         try:
             record.delete_address()
             print(f"Адреса видалена для контакта '{name}'.")
@@ -461,146 +629,85 @@ class Controller():
         if not self.book.data:
             print("Адресна книга порожня.")
         else:
-            table = Table(show_header=True, header_style="bold magenta", border_style='bold violet')
-            table.add_column('Name')
-            table.add_column("Phone")
-            table.add_column("Address")
-            table.add_column("Email")
-            table.add_column("Birthday")
-            for record_id, record in self.book.data.items():
-                phones = '; '.join(str(phone) for phone in record.phones)
-                birthday_info = record.birthday.value if record.birthday else ""
-                address_info = record.address.value if record.address else ""
-                email_info = record.email.value if record.email else ""
-                table.add_row(record.name.value, phones, address_info, email_info, birthday_info)
-                table.add_section()
-            console.print(table)
+            from .render import print_table, CONTACT_COLUMNS
+            METRICS.touched(print_table(CONTACT_COLUMNS, (self.rows.contact(record) for record in self.book.data.values()),
+                                        header_style="bold magenta", border_style='bold violet'))
 
     def do_list_note(self):
         if not self.book.data:
             print("Адресна книга порожня.")
         else:
-            table = Table(show_header=True, header_style="bold cyan", border_style='bold yellow')
-            table.add_column('Author')
-            table.add_column("Note")
-            table.add_column("Tag")
-            table.add_column("Date", style="dim", width=12)
-            for name, record in self.book.data.items():
-                if isinstance(record, NoteRecord) and record.notes:
-                    for h in record.notes:
-                        table.add_row(name, h.value, h.tags, h.date)
-                        table.add_section()
-            console.print(table)
+            from .render import print_table
+            rows = ((name, text, tags, date) for record in self.book.data.values()
+                    for name, text, date, tags in self.rows.notes(record))
+            print_table(('Author', 'Note', 'Tag', ('Date', {'style': 'dim', 'width': 12})), rows,
+                        header_style="bold cyan", border_style='bold yellow')
+            METRICS.touched(len(self.book.data))
 
     def do_find_record_by_trem(self, line):
         matching_records = self.book.find_by_term(line)
-        table = Table(show_header=True, header_style="bold red", border_style='bold yellow')
-        table.add_column('Name')
-        table.add_column("Phone")
-        table.add_column("Address")
-        table.add_column("Email")
-        table.add_column("Birthday")
         if matching_records:
-            for record in matching_records:
-                phones = '; '.join(str(phone) for phone in record.phones)
-                birthday_info = record.birthday.value if record.birthday else ""
-                address_info = record.address.value if record.address else ""
-                email_info = record.email.value if record.email else ""
-                table.add_row(record.name.value, phones, address_info, email_info, birthday_info)
-                table.add_section()
-            console.print(table)
+            from .render import print_table, CONTACT_COLUMNS
+            print_table(CONTACT_COLUMNS, (self.rows.contact(record) for record in matching_records),
+                        header_style="bold red", border_style='bold yellow')
         else:
             print("Даних із таким текстом не існує!!!.")
     
     def do_find_notes_by_term(self, term):
+        from .render import print_table, tags_text
         term = term.strip().lower()
-        table = Table(show_header=True, header_style="bold cyan", border_style='bold yellow')
-        table.add_column('Name')
-        table.add_column('Note')
-        table.add_column('Date')
-        table.add_column('Tags')
-        
-        found_notes = False
-        for name, record in self.book.data.items():
-            if isinstance(record, NoteRecord):
-                matching_notes = record.find_notes_by_term(term)
-                for note in matching_notes:
-                    table.add_row(name, note.value, note.tags, note.date)
-                    table.add_section()
-                    found_notes = True
-        
-        console = Console()
-        if found_notes:
-            console.print(table)
+        rows = [(name, note.value, note.date or '', tags_text(note.tags))
+                for name, note in self.book.find_notes_by_term(term)]
+        if rows:
+            print_table(('Name', 'Note', 'Date', 'Tags'), rows, header_style="bold cyan", border_style='bold yellow')
         else:
             print("Даних із таким текстом не існує!!!.")
     
     def do_days_to_birthday(self, line, when=9999): # >>>birthday John (до дня народження контакту John, залишилось 354 днів)
-        if when == 9999:
-            table = Table(show_header=True, header_style="bold magenta", border_style='bold violet')
-        else:
-            table = Table(show_header=False, header_style="bold magenta", border_style='bold violet')
-        table.add_column('Name')
-        table.add_column("Phone")
-        table.add_column("Email")
-        table.add_column("Birthday")
-        table.add_column("Days to b-day")
         name = self.line_to_name(line)
         record = self.book.find(name)
-        if record:
-            days_until_birthday = record.days_to_birthday()
-            if 0 < days_until_birthday <= when:
-#                print(f"До дня народження {name} {record.birthday} залишилось {days_until_birthday} днів\n")
-                phones = '; '.join(str(phone) for phone in record.phones)
-                birthday_info = record.birthday.value if record.birthday else ""
-                email_info = record.email.value if record.email else ""
-                table.add_row(record.name.value, phones, email_info, birthday_info, str(days_until_birthday))
-                table.add_section()
-            elif days_until_birthday == 0:
-#                print(f"День народження контакту {name} сьогодні!!!\n")
-                phones = '; '.join(str(phone) for phone in record.phones)
-                birthday_info = record.birthday.value if record.birthday else ""
-                email_info = record.email.value if record.email else ""
-                table.add_row(record.name.value, phones, email_info, birthday_info, 'TODAY!!!')
-                table.add_section()
-            elif (days_until_birthday > when or days_until_birthday == -1) and (when != 9999):
-                return
-            else:
-                print(f"День народження {name} не додано в книгу контактів\n")
-            if when == 9999:
-                console.print (table)
-            else:
-                return (days_until_birthday)
-        else:
+        if not record:
             print(f"Контакт '{name}' не знайдений")
-            
+            return
+        days_until_birthday = record.days_to_birthday()
+        if when != 9999:
+            return days_until_birthday if 0 <= days_until_birthday <= when else None
+        if days_until_birthday == -1:
+            print(f"День народження {name} не додано в книгу контактів\n")
+            return
+        from .render import print_table, NAME, PHONE, EMAIL, BIRTHDAY
+        row = self.rows.contact(record)
+        label = 'TODAY!!!' if days_until_birthday == 0 else str(days_until_birthday)
+        print_table(('Name', 'Phone', 'Email', 'Birthday', 'Days to b-day'),
+                    [(row[NAME], row[PHONE], row[EMAIL], row[BIRTHDAY], label)],
+                    header_style="bold magenta", border_style='bold violet')
+
     def do_when (self, days):
-        table = Table(show_header=True, header_style="bold magenta", border_style='bold violet')
-        table.add_column('Name')
-        table.add_column("Phone")
-        table.add_column("Email")
-        table.add_column("Birthday")
-        table.add_column("Days to b-day")
         if not days:
             print ("Введіть 'when' та кількість днів, на які хочете побачити прогноз")
             return
         if not days.isdigit():
             print ("Введіть кількість днів додатнім числовим значенням")
             return
-        for record in self.book.values():
-            phones = '; '.join(str(phone) for phone in record.phones)
-            birthday_info = record.birthday.value if record.birthday else ""
-            email_info = record.email.value if record.email else ""
-            when = self.do_days_to_birthday (record.name.value, int(days))
-            if when != None and when != 0 and when != 1:
-                table.add_row(record.name.value, phones, email_info, birthday_info, str(when))
-            elif when == 0:
-                table.add_row(record.name.value, phones, email_info, birthday_info, 'TODAY!!!')
-            elif when == 1:
-                table.add_row(record.name.value, phones, email_info, birthday_info, 'TOMORROW!!!')
-            
-            table.add_section()
-        console.print(table)
+        self._print_birthdays(self.book.values(), int(days))
+
+    def _print_birthdays(self, records, limit):
+        from .render import print_table, NAME, PHONE, EMAIL, BIRTHDAY
+        rows = []
+        read = 0
+        for record in records:
+            read += 1
+            if not record.birthday:
+                continue
+            when = record.days_to_birthday()
+            if when > limit:
+                continue
+            row = self.rows.contact(record)
+            label = 'TODAY!!!' if when == 0 else 'TOMORROW!!!' if when == 1 else str(when)
+            rows.append((row[NAME], row[PHONE], row[EMAIL], row[BIRTHDAY], label))
+        METRICS.touched(read)
+        print_table(('Name', 'Phone', 'Email', 'Birthday', 'Days to b-day'), rows,
+                    header_style="bold magenta", border_style='bold violet')
 
 
     def do_add_note(self, line):
@@ -614,6 +721,7 @@ class Controller():
             return
         note_text = input('Введіть нотатку: ')
         tags = input('Введіть теги: ')
+        self._touch(name_normal)
         record.add_note(note_text, tags)
         print(f"Заметка додана до контакта {name_normal}.")
 
@@ -623,16 +731,10 @@ class Controller():
         if not record:
             print(f"Контакт з ім'ям '{name}' не знайдено.")
             return
-        table = Table(show_header=True, header_style="bold cyan", border_style='bold yellow')
-        table.add_column('Name')
-        table.add_column('Note')
-        table.add_column('Date')
-        table.add_column('Tags')
-        if isinstance(record, NoteRecord) and record.notes:
-            for note in record.notes:
-                table.add_row(name, note.value, note.tags, note.date)
-                table.add_section()
-            console.print(table)
+        notes = self.rows.notes(record)
+        if notes:
+            from .render import print_table
+            print_table(('Name', 'Note', 'Date', 'Tags'), notes, header_style="bold cyan", border_style='bold yellow')
         else:
             print(f"Для контакта '{name}' не знайдено нотаток або вони не підтримуються.")
 
@@ -641,6 +743,7 @@ class Controller():
         if name_normal in self.book:
             record = self.book[name_normal]
             if isinstance(record, NoteRecord):
+                self._touch(name_normal)
                 record.notes.clear()
                 print(f"Усі нотатки для '{name_normal}' було видалено.")
             else:
@@ -656,6 +759,7 @@ class Controller():
             return
         new_text= input("Введіть нову нотатку: ")
         new_tags = input("Введіть новий тег: ")
+        self._touch(name)
         record.edit_note(new_text, new_tags)
         print("Примітка успішно відредагована.")
 
@@ -663,98 +767,216 @@ class Controller():
         if not line:
             print("Введіть шлях до папки, яку треба сортувати")
             return
+        from .sort_files import run
         try:
             run(line)
         except FileNotFoundError:
             print('Така папка не існує на диску. Можливо треба ввести повний шлях\n')
+        except OSError as e:
+            print(f'Помилка під час сортування: {e}\n')
+
+    def do_stats(self, line):
+        if not METRICS.stats:
+            print("Ще немає виміряних команд.")
+            return
+        from .render import print_table
+        # назви операцій не обрізаються "…", а переносяться, якщо таблиця ширша за консоль
+        columns = [('Операція', {'overflow': 'fold'}), 'Кількість', 'Середнє, мс', 'p50, мс', 'p95, мс', 'Макс, мс', 'Записів']
+        rows = [(name, str(stat.count), f'{stat.total / stat.count * 1000:.2f}',
+                 f'{stat.percentile(50) * 1000:.2f}', f'{stat.percentile(95) * 1000:.2f}',
+                 f'{stat.max * 1000:.2f}', str(stat.records))
+                for name, stat in sorted(METRICS.stats.items())]
+        print_table(columns, rows, sections=False, header_style="bold blue", border_style='bold green')
+        if line:
+            try:
+                METRICS.export(line)
+                print(f"Метрики записані у файл '{line}'.")
+            except OSError as e:
+                print(f"Помилка при записі метрик: {e}")
+
+    def do_query(self, line):
+        from .query import parse, plan, execute, make_index
+        try:
+            query = parse(line)
+        except ValueError as e:
+            print(e)
+            return
+        if self._query_index is None:
+            self._query_index = make_index(self.book)
+        if query.explain:
+            print(f"План: {plan(query, self._query_index)[0]}")
+
+        # результати виводяться сторінками по мірі знаходження
+        page, found = [], 0
+        for record in execute(self.book, query, self._query_index):
+            page.append(record)
+            found += 1
+            if len(page) >= QUERY_PAGE:
+                self._print_records(page, header=found == len(page))
+                page = []
+        if page:
+            self._print_records(page, header=found == len(page))
+        if not found:
+            print("Даних за цим запитом не знайдено.")
+
+    def _print_records(self, records, header=True):
+        from .render import print_table, CONTACT_COLUMNS
+        # однакова ширина колонок, щоб сторінки результатів виглядали однією таблицею
+        widths = (20, 12, 20, 20, 10)
+        print_table([(title, {'min_width': width}) for title, width in zip(CONTACT_COLUMNS, widths)],
+                    (self.rows.contact(record) for record in records), header=header, sections=False,
+                    header_style="bold red", border_style='bold yellow')
+
+    def do_find_duplicates(self):
+        from .duplicates import find_duplicates
+        duplicates = find_duplicates(self.book)
+        if not duplicates:
+            print("Дублікатів не знайдено.")
+            return
+        from .render import print_table
+        print_table(('Схожість', 'Контакт 1', 'Контакт 2', 'Причини'),
+                    ((f'{value:.0%}', first, second, ', '.join(reasons)) for value, first, second, reasons in duplicates),
+                    sections=False, header_style="bold red", border_style='bold yellow')
+        print("Для об'єднання використовуйте команду merge_contacts")
+
+    def do_merge_contacts(self):
+        from .duplicates import merge_records
+        names = []
+        for question in ("Введіть ім'я контакту, який залишиться: ", "Введіть ім'я контакту, який буде приєднано: "):
+            line = input(question)
+            if not line.strip():
+                print("Ім'я не введено.")
+                return
+            names.append(self.line_to_name(line))
+        keep, other = names
+        for name in names:
+            if name not in self.book:
+                print(f"Контакт з ім'ям '{name}' не знайдено.")
+                return
+        if keep == other:
+            print("Потрібно вказати два різні контакти.")
+            return
+        self._touch(keep)
+        self._touch(other)
+        merge_records(self.book, keep, other)
+        print(f"Контакт '{other}' об'єднано з '{keep}'.")
+
+    def do_undo(self):
+        change = self.history.undo()
+        self._book_changed()
+        print(f"Скасовано: {change}" if change else "Немає змін для скасування.")
+
+    def do_redo(self):
+        change = self.history.redo()
+        self._book_changed()
+        print(f"Повторено: {change}" if change else "Немає змін для повторення.")
+
+    def do_history(self):
+        if not self.history.undo_stack and not self.history.redo_stack:
+            print("Історія змін порожня.")
+            return
+        for change in self.history.undo_stack[-20:]:
+            print(f"  {change}")
+        for change in reversed(self.history.redo_stack):
+            print(f"  (скасовано) {change}")
+
+    def do_checkout(self, line):
+        moment = None
+        for time_format in ("%H:%M:%S", "%H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M"):
+            try:
+                moment = datetime.strptime(line.strip(), time_format)
+                break
+            except ValueError:
+                continue
+        if moment is None:
+            print("Введіть час у форматі ГГ:ХХ[:СС] або РРРР-ММ-ДД ГГ:ХХ:СС")
+            return
+        if moment.year == 1900:
+            moment = datetime.combine(date.today(), moment.time())
+        # зміни, зроблені впродовж вказаної секунди, залишаються
+        moment = moment.replace(microsecond=999999)
+        steps = self.history.checkout(moment)
+        self._book_changed()
+        print(f"Книга повернута у стан на {moment:%Y-%m-%d %H:%M:%S} (змін: {steps}).")
+
+    def do_import(self, line):
+        from .exchange import import_file
+        start = time.perf_counter()
+        written = []
+
+        def before_write():
+            # масовий імпорт не записується в історію, тому попередні зміни вже не скасувати;
+            # історія очищається лише коли у книгу справді пишеться перший пакет
+            if not written:
+                self.history.clear()
+            written.append(True)
+
+        try:
+            imported, failed, errors = import_file(self.book, line.strip(), before_write=before_write)
+        except FileNotFoundError:
+            print(f"Файл '{line.strip()}' не знайдено.")
+            return
+        except ValueError as e:
+            print(f"Помилка при імпорті: {e}")
+            return
+        finally:
+            # перерваний імпорт теж міг записати частину пакетів
+            if written:
+                self._book_changed()
+        elapsed = time.perf_counter() - start
+        for line_no, message in errors:
+            print(f"Рядок {line_no}: {message}")
+        if failed > len(errors):
+            print(f"... та ще {failed - len(errors)} помилок")
+        print(f"Імпортовано контактів: {imported}, з помилками: {failed} "
+              f"({(imported + failed) / elapsed if elapsed else 0:.0f} рядків/с)")
+
+    def do_export(self, line):
+        from .exchange import export_file
+        start = time.perf_counter()
+        try:
+            count = export_file(self.book, line.strip())
+        except (ValueError, OSError) as e:
+            print(f"Помилка при експорті: {e}")
+            return
+        elapsed = time.perf_counter() - start
+        print(f"Експортовано контактів: {count} ({count / elapsed if elapsed else 0:.0f} рядків/с)")
+
+
+_controller = None
+
+
+def get_controller():
+    global _controller
+    if _controller is None:
+        _controller = Controller()
+    return _controller
+
 
+def __getattr__(name):
+    # module.controller / module.console створюються при першому зверненні
+    if name == 'controller':
+        return get_controller()
+    if name == 'console':
+        return get_console()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-class CommandValidator(Validator):
-    def validate(self, document):
-        text = document.text
-        if text.startswith("add_phone"):
-            x = text.strip().split(" ")
-            if len(x) < 2:
-                raise ValidationError(message="Введіть: <Ім'я>", cursor_position=len(text))
-
-        if text.startswith("delete_phone"):
-            x = text.strip().split(" ")
-            if len(x) < 2:
-                raise ValidationError(message="Введіть: <Ім'я>", cursor_position=len(text))
-
-        if text.startswith("add_birthday"):
-            x = text.strip().split(" ")
-            if len(x) < 2:
-                raise ValidationError(message="Введіть: <Ім'я>", cursor_position=len(text))
-
-        if text.startswith("find_record_by_trem"):
-            x = text.split(" ")
-            if len(x) == 1:
-                raise ValidationError(message="Введіть: будь який термін для пошуку", cursor_position=len(text))
-
-        if text.startswith("days_to_birthday"):
-            x = text.strip().split(" ")
-            if len(x) < 2:
-                raise ValidationError(message="Введіть: <Ім'я> для пошуку", cursor_position=len(text))
-
-        if text.startswith("when"):
-            x = text.strip().split(" ")
-            if len(x) < 2:
-                raise ValidationError(message="Введіть: кількість днів для пошуку", cursor_position=len(text))
-
-        if text.startswith("sort_files"):
-            x = text.strip().split(" ")
-            if len(x) != 2:
-                raise ValidationError(message="Введіть: шлях до папки, яку треба сортувати", cursor_position=len(text))
-
-        if text.startswith("add_note"):
-            x = text.strip().split(" ")
-            if len(x) < 2:
-                raise ValidationError(message="Введіть: <Ім'я>", cursor_position=len(text))
-
-        if text.startswith("find_note_by_name"):
-            x = text.strip().split(" ")
-            if len(x) < 2:
-                raise ValidationError(message="Введіть: <Ім'я> для пошуку", cursor_position=len(text))
-            
-        if text.startswith("find_notes_by_term"):
-            x = text.split(" ")
-            if len(x) != 2:
-                raise ValidationError(message="Введіть: текст для пошуку", cursor_position=len(text))
-            
-        if text.startswith("edit_note"):
-            x = text.strip().split(" ")
-            if len(x) < 2:
-                raise ValidationError(message="Введіть: <Ім'я>", cursor_position = len(text))
-            
-        if text.startswith("delete_all_notes"):
-            x = text.strip().split(" ")
-            if len(x) < 2:
-                raise ValidationError(message="Введіть: <Ім'я>", cursor_position=len(text))
-
-        if text.startswith("add_email"):
-            x = text.strip().split(" ")
-            if len(x) < 2:
-                raise ValidationError(message="Введіть: <Ім'я>", cursor_position=len(text))
-
-        if text.startswith("delete_email"):
-            x = text.strip().split(" ")
-            if len(x) < 2:
-                raise ValidationError(message="Введіть: <Ім'я>", cursor_position=len(text))
-
-        if text.startswith("add_address"):
-            x = text.strip().split(" ")
-            if len(x) < 2:
-                raise ValidationError(message="Введіть: <Ім'я>", cursor_position=len(text))
-
-        if text.startswith("delete_address"):
-            x = text.strip().split(" ")
-            if len(x) < 2:
-                raise ValidationError(message="Введіть: <Ім'я>", cursor_position=len(text))
-
-controller = Controller()
 
 def handle_command(command):
+    controller = get_controller()
+    name = command.strip().split(' ', 1)[0].lower()
+    if name == 'profile':
+        from .metrics import profile
+        return profile(handle_command, command.strip()[len(name):].strip())
+    with METRICS.timed(f'command.{name}'):
+        controller.history.begin(command.strip())
+        try:
+            return dispatch_command(controller, command)
+        finally:
+            controller.history.commit()
+
+
+def dispatch_command(controller, command):
     if command.lower().startswith("add_name"):
         return controller.do_add_name()
     elif command.lower().startswith("delete_name"):
@@ -808,6 +1030,14 @@ def handle_command(command):
     elif command.lower().startswith("sort_files"):
         _, name = command.split(" ")
         return controller.do_sort_files(name)
+    elif command.lower().startswith("import"):
+        first_space_index = command.find(' ')
+        _, path = [command[:first_space_index], command[first_space_index+1:]]
+        return controller.do_import(path)
+    elif command.lower().startswith("export"):
+        first_space_index = command.find(' ')
+        _, path = [command[:first_space_index], command[first_space_index+1:]]
+        return controller.do_export(path)
     elif command.lower().startswith("add_note"):
         first_space_index = command.find(' ')
         _, name = [command[:first_space_index], command[first_space_index+1:]]
@@ -835,23 +1065,56 @@ def handle_command(command):
         return 'Good bye!'
     elif command.lower() == "save":
         return controller.do_save()
+    elif command.lower().startswith("query"):
+        return controller.do_query(command[len("query"):])
+    elif command.lower().startswith("find_duplicates"):
+        return controller.do_find_duplicates()
+    elif command.lower().startswith("merge_contacts"):
+        return controller.do_merge_contacts()
+    elif command.lower() == "undo":
+        return controller.do_undo()
+    elif command.lower() == "redo":
+        return controller.do_redo()
+    elif command.lower() == "history":
+        return controller.do_history()
+    elif command.lower().startswith("checkout"):
+        return controller.do_checkout(command[len("checkout"):])
+    elif command.lower().startswith("stats"):
+        return controller.do_stats(command[len("stats"):].strip())
+
+
+def startup():
+    """Все, що має відбутися до першого запиту команди. Повертає (completer, validator)."""
+    controller = get_controller()
+    controller.do_load()
+    print("Ласкаво просимо до Адресної Книги")
+    # таблиця "when 0" будується лише якщо у когось сьогодні день народження,
+    # з уже знайдених записів - книга не переглядається вдруге
+    today = birthdays_today(controller.book)
+    if today:
+        controller._print_birthdays(today, 0)
+
+    from prompt_toolkit.completion import NestedCompleter
+    from .validator import CommandValidator
+    command_interpreter = NestedCompleter.from_nested_dict(dict.fromkeys(COMMANDS))
+    return command_interpreter, CommandValidator()
 
 
 def main():
-    controller.do_load()
-    print("Ласкаво просимо до Адресної Книги")
-    controller.do_when('0')
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        from .server import main as serve_main
+        return serve_main(sys.argv[2:])
+    if len(sys.argv) > 1 and sys.argv[1] == 'remind':
+        from .reminders import main as remind_main
+        return remind_main(sys.argv[2:])
+    command_interpreter, validator = startup()
+    from prompt_toolkit import prompt
 
     while True:
-        commands_for_interp = {}
-        for command in COMMANDS.keys():
-            commands_for_interp[command] = None
-        command_interpreter = NestedCompleter.from_nested_dict(commands_for_interp)
-
-        user_input = prompt('Enter command: ', completer=command_interpreter, validator=CommandValidator(),
+        user_input = prompt('Enter command: ', completer=command_interpreter, validator=validator,
                             validate_while_typing=False)
         if user_input.lower() == "exit":
-            controller.do_save()
+            get_controller().do_exit()
             print("Good bye!")
             break
         response = handle_command(user_input)
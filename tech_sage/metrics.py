@@ -0,0 +1,151 @@
+"""
+Вимірювання часу виконання команд та операцій адресної книги.
+
+METRICS.timed(name) - контекстний менеджер, що записує тривалість операції
+у гістограму та кількість записів, яких вона торкнулась. Вкладені виміри
+(наприклад, find_by_term всередині команди) додають свої записи до
+зовнішнього, тому для команди видно, скільки записів вона обробила.
+
+"Торкнулась" для всіх книг означає одне: скільки записів операція
+прочитала (переглянула в пам'яті або вичитала з бази) чи записала.
+Пошук у AddressBook перебирає всю книгу, а SQLite фільтрує рядки
+індексами і повертає лише знайдені - різниця у числах і є різницею
+у вартості. Код, що перебирає книгу сам (list_book, when, query),
+додає свої записи до поточного виміру через METRICS.touched(n).
+"""
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# верхні межі кошиків гістограми, секунди
+BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, math.inf)
+
+
+class Timing:
+    def __init__(self, name):
+        self.name = name
+        self.records = 0
+        self.seconds = 0.0
+
+
+class Stat:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.records = 0
+        self.buckets = [0] * len(BUCKETS)
+
+    def add(self, seconds, records):
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        self.records += records
+        for idx, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[idx] += 1
+                break
+
+    def percentile(self, q):
+        # оцінка за гістограмою: верхня межа кошика, у який потрапляє q-й перцентиль
+        target = q / 100 * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.buckets):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {'count': self.count,
+                'total_s': self.total,
+                'avg_s': self.total / self.count if self.count else 0.0,
+                'min_s': self.min if self.count else 0.0,
+                'max_s': self.max,
+                'p50_s': self.percentile(50),
+                'p95_s': self.percentile(95),
+                'records': self.records,
+                'histogram': {('inf' if bound == math.inf else str(bound)): count
+                              for bound, count in zip(BUCKETS, self.buckets)}}
+
+
+class Metrics:
+    def __init__(self):
+        self.stats = {}
+        # вкладеність timed() - своя для кожного потоку: server виконує читання у пулі потоків
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def record(self, name, seconds, records=0):
+        with self._lock:
+            stat = self.stats.get(name)
+            if stat is None:
+                stat = self.stats[name] = Stat()
+            stat.add(seconds, records)
+
+    @contextmanager
+    def timed(self, name):
+        timing = Timing(name)
+        self._stack.append(timing)
+        start = time.perf_counter()
+        try:
+            yield timing
+        finally:
+            timing.seconds = time.perf_counter() - start
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1].records += timing.records
+            self.record(name, timing.seconds, timing.records)
+
+    def touched(self, count):
+        """Додає count записів до поточного виміру (якщо він є)."""
+        if self._stack:
+            self._stack[-1].records += count
+
+    def reset(self):
+        self.stats.clear()
+
+    def export(self, path):
+        with self._lock:
+            metrics = {name: stat.to_dict() for name, stat in sorted(self.stats.items())}
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({'created': datetime.now().isoformat(timespec='seconds'), 'metrics': metrics},
+                      file, ensure_ascii=False, indent=2)
+
+
+METRICS = Metrics()
+
+
+def profile(func, *args, top=15):
+    """Виконує func(*args) під cProfile та tracemalloc і друкує найдорожчі функції та виділення пам'яті."""
+    import cProfile
+    import pstats
+    import tracemalloc
+
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    try:
+        result = profiler.runcall(func, *args)
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    print(f'\n--- cProfile: топ {top} за cumulative ---')
+    pstats.Stats(profiler).strip_dirs().sort_stats('cumulative').print_stats(top)
+    print(f'--- tracemalloc: поточна {current / 1024:.1f} KiB, пік {peak / 1024:.1f} KiB ---')
+    for stat in snapshot.statistics('lineno')[:top]:
+        print(stat)
+    return result
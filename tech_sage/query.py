@@ -0,0 +1,322 @@
+"""
+Мова запитів до адресної книги.
+
+    query phone:067* tag:work birthday<30d name~ivan
+
+Фільтри (усі мають виконуватись одночасно):
+    name:Ivan*  name~ivan        ім'я за шаблоном (* та ?) або підрядком
+    phone:067*  phone~123        телефон за шаблоном або підрядком
+    email:a@b.com  email~gmail   e-mail
+    address~kyiv                 адреса
+    tag:work  tag~wo             тег нотатки
+    note~text                    текст нотатки
+    birthday<30d                 день народження впродовж N днів
+    birthday:05-31               день народження у вказаний день
+    limit:20                     не більше N результатів
+    explain                      показати план виконання
+Слово без поля шукається як name~слово. Значення з пробілами беруться в лапки.
+
+Планувальник оцінює розмір множини кандидатів для кожного фільтра, який
+можна відповісти індексом (BookIndex, для SQLite - DatabaseIndex), перетинає ці множини від меншої до
+більшої, а решту фільтрів перевіряє на кандидатах. Результати віддаються
+генератором, тож рендеринг починається до завершення пошуку.
+"""
+import shlex
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from fnmatch import fnmatchcase
+
+from .main import next_birthday
+from .metrics import METRICS
+
+FIELDS = ('name', 'phone', 'email', 'address', 'tag', 'note', 'birthday')
+MAX_WINDOW = 366
+
+
+def _note_tags(note):
+    tags = note.tags or []
+    if isinstance(tags, str):
+        tags = tags.replace(',', ' ').split()
+    return [tag.lower() for tag in tags]
+
+
+def _birthday(record):
+    if not record.birthday:
+        return None
+    try:
+        return date.fromisoformat(record.birthday.value)
+    except ValueError:
+        return datetime.strptime(record.birthday.value, "%Y-%m-%d").date()
+
+
+class BookIndex:
+    """Індекси книги для планувальника. Будується один раз і скидається при змінах книги."""
+
+    def __init__(self, book):
+        self.size = 0
+        self.names = []                 # відсортовані (ім'я у нижньому регістрі, ім'я)
+        self.phones = []                # відсортовані (телефон, ім'я)
+        self.emails = {}                # e-mail у нижньому регістрі -> {ім'я}
+        self.tags = {}                  # тег -> {ім'я}
+        self.birthdays = {}             # (місяць, день) -> {ім'я}
+        for name, record in book.data.items():
+            self.size += 1
+            self.names.append((name.lower(), name))
+            self.phones.extend((phone.value, name) for phone in record.phones)
+            if record.email:
+                self.emails.setdefault(record.email.value.lower(), set()).add(name)
+            for note in getattr(record, 'notes', ()):
+                for tag in _note_tags(note):
+                    self.tags.setdefault(tag, set()).add(name)
+            birthday = _birthday(record)
+            if birthday:
+                self.birthdays.setdefault((birthday.month, birthday.day), set()).add(name)
+        self.names.sort()
+        self.phones.sort()
+
+    @staticmethod
+    def _prefix_range(items, prefix):
+        return bisect_left(items, (prefix,)), bisect_right(items, (prefix + '\uffff',))
+
+    @classmethod
+    def _lookup(cls, items, prefix, exact):
+        start, end = cls._prefix_range(items, prefix)
+        return {name for key, name in items[start:end] if not exact or key == prefix}
+
+    def find_names(self, prefix, exact=False):
+        return self._lookup(self.names, prefix.lower(), exact)
+
+    def find_phones(self, prefix, exact=False):
+        return self._lookup(self.phones, prefix, exact)
+
+    def find_email(self, email):
+        return set(self.emails.get(email, set()))
+
+    def find_tag(self, tag):
+        return set(self.tags.get(tag, set()))
+
+    def find_birthday(self, month, day):
+        return set(self.birthdays.get((month, day), set()))
+
+    def birthday_window(self, days, today=None):
+        today = today or date.today()
+        result = set()
+        for offset in range(min(days, MAX_WINDOW)):
+            day = today + timedelta(days=offset)
+            result |= self.find_birthday(day.month, day.day)
+            # 29 лютого у невисокосний рік святкується 28-го (див. next_birthday)
+            if day.month == 2 and day.day == 28 and (day + timedelta(days=1)).month == 3:
+                result |= self.find_birthday(2, 29)
+        return result
+
+
+class DatabaseIndex(BookIndex):
+    """
+    Той самий інтерфейс поверх індексів бази (SQLiteAddressBook): нічого не
+    читається наперед, кожен пошук - запит до індексу таблиці. Методи
+    names_by_* спершу записують у базу змінені на місці записи, тож план
+    бачить і незбережені зміни. Для тегів індексу у базі немає - такий
+    фільтр перевіряється на кандидатах.
+    """
+
+    def __init__(self, book):
+        self.book = book
+
+    @property
+    def size(self):
+        return len(self.book)
+
+    def find_names(self, prefix, exact=False):
+        names = self.book.names_by_name_prefix(prefix)
+        return {name for name in names if name.lower() == prefix} if exact else names
+
+    def find_phones(self, prefix, exact=False):
+        return self.book.names_by_phone_prefix(prefix, exact)
+
+    def find_email(self, email):
+        return self.book.names_by_email(email)
+
+    def find_tag(self, tag):
+        return None
+
+    def find_birthday(self, month, day):
+        return self.book.names_by_birthday(month, day)
+
+
+def make_index(book):
+    """BookIndex для книг у пам'яті, DatabaseIndex - для книг, що читаються з бази на вимогу."""
+    if getattr(book, 'in_memory', True):
+        return BookIndex(book)
+    return DatabaseIndex(book)
+
+
+class Filter:
+    def __init__(self, field, op, value):
+        self.field = field
+        self.op = op
+        self.value = value
+        self.pattern = value.lower()
+        if field == 'birthday':
+            self._parse_birthday()
+
+    def __str__(self):
+        return f'{self.field}{self.op}{self.value}'
+
+    def _parse_birthday(self):
+        if self.op == '<':
+            if not (self.value.endswith('d') and self.value[:-1].isdigit()):
+                raise ValueError(f"Очікується birthday<Nd, отримано '{self}'")
+            self.days = int(self.value[:-1])
+        elif self.op == ':':
+            try:
+                month, day = (int(part) for part in self.value[-5:].split('-'))
+            except ValueError:
+                raise ValueError(f"Очікується birthday:ММ-ДД, отримано '{self}'")
+            self.month_day = (month, day)
+        else:
+            raise ValueError(f"Непідтримуваний оператор для birthday: '{self}'")
+
+    def _text_match(self, text):
+        text = text.lower()
+        if self.op == '~':
+            return self.pattern in text
+        return fnmatchcase(text, self.pattern)
+
+    def matches(self, record):
+        field = self.field
+        if field == 'name':
+            return self._text_match(record.name.value)
+        if field == 'phone':
+            return any(self._text_match(phone.value) for phone in record.phones)
+        if field == 'email':
+            return bool(record.email) and self._text_match(record.email.value)
+        if field == 'address':
+            return bool(record.address) and self._text_match(record.address.value)
+        notes = getattr(record, 'notes', ())
+        if field == 'tag':
+            return any(self._text_match(tag) for note in notes for tag in _note_tags(note))
+        if field == 'note':
+            return any(self._text_match(note.value) for note in notes)
+        birthday = _birthday(record)
+        if birthday is None:
+            return False
+        if self.op == '<':
+            today = date.today()
+            return (next_birthday(birthday, today) - today).days < self.days
+        return (birthday.month, birthday.day) == self.month_day
+
+    def _glob_prefix(self):
+        """Для шаблону 'abc*' повертає 'abc', для точного значення - саме значення, інакше None."""
+        if self.op != ':':
+            return None
+        wildcard = min((self.pattern.find(c) for c in '*?[' if c in self.pattern), default=-1)
+        if wildcard == -1:
+            return self.pattern
+        if wildcard > 0 and self.pattern[wildcard:] == '*':
+            return self.pattern[:wildcard]
+        return None
+
+    def candidates(self, index):
+        """Множина імен-кандидатів з індексу або None, якщо фільтр потребує повного перегляду."""
+        if self.field == 'birthday':
+            if self.op == '<':
+                return index.birthday_window(self.days)
+            return index.find_birthday(*self.month_day)
+        if self.op != ':':
+            return None
+        prefix = self._glob_prefix()
+        if prefix is None:
+            return None
+        exact = prefix == self.pattern
+        if self.field == 'name':
+            return index.find_names(prefix, exact)
+        if self.field == 'phone':
+            return index.find_phones(prefix, exact)
+        if self.field == 'email' and exact:
+            return index.find_email(prefix)
+        if self.field == 'tag' and exact:
+            return index.find_tag(prefix)
+        return None
+
+
+class Query:
+    def __init__(self, filters, limit=None, explain=False):
+        self.filters = filters
+        self.limit = limit
+        self.explain = explain
+
+
+def parse(text):
+    try:
+        tokens = shlex.split(text)
+    except ValueError as e:
+        raise ValueError(f'Помилка у запиті: {e}')
+    filters, limit, explain = [], None, False
+    for token in tokens:
+        if token.lower() == 'explain':
+            explain = True
+            continue
+        positions = [(token.find(op), op) for op in (':', '~', '<') if op in token]
+        if not positions:
+            filters.append(Filter('name', '~', token))
+            continue
+        position, op = min(positions)
+        field, value = token[:position].lower(), token[position + 1:]
+        if field == 'limit' and op == ':':
+            if not value.isdigit():
+                raise ValueError(f"Очікується limit:N, отримано '{token}'")
+            limit = int(value)
+            continue
+        if field not in FIELDS:
+            raise ValueError(f"Невідоме поле '{field}'. Доступні: {', '.join(FIELDS)}, limit")
+        if not value:
+            raise ValueError(f"Порожнє значення у '{token}'")
+        filters.append(Filter(field, op, value))
+    return Query(filters, limit, explain)
+
+
+def plan(query, index):
+    """
+    Повертає (опис плану, відсортовані кандидати або None для повного перегляду,
+    фільтри, що перевіряються на кандидатах).
+    """
+    indexed = []
+    for query_filter in query.filters:
+        names = query_filter.candidates(index)
+        if names is not None:
+            indexed.append((len(names), str(query_filter), names))
+    if not indexed:
+        return f'повний перегляд {index.size} записів', None, query.filters
+
+    indexed.sort(key=lambda item: item[0])
+    candidates = set(indexed[0][2])
+    steps = [f'індекс {indexed[0][1]} ({indexed[0][0]})']
+    for size, description, names in indexed[1:]:
+        if not candidates:
+            break
+        candidates &= names
+        steps.append(f'∩ {description} ({size})')
+    steps.append(f'= {len(candidates)} кандидатів')
+    return ' '.join(steps), sorted(candidates), query.filters
+
+
+def execute(book, query, index):
+    """Генератор записів, що задовольняють усі фільтри запиту."""
+    _, candidates, filters = plan(query, index)
+    if candidates is None:
+        records = book.data.values()
+    else:
+        # find не кешує записи книги SQLite, на відміну від book.data[name]
+        records = (record for record in map(book.find, candidates) if record is not None)
+    found = read = 0
+    try:
+        for record in records:
+            # ліміт перевіряється до видачі запису, тож limit:0 не повертає нічого
+            if query.limit is not None and found >= query.limit:
+                return
+            read += 1
+            if all(query_filter.matches(record) for query_filter in filters):
+                yield record
+                found += 1
+    finally:
+        METRICS.touched(read)
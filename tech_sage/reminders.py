@@ -0,0 +1,217 @@
+"""
+Нагадування про дні народження як окремий довготривалий процес:
+
+    tech_sage remind [--at 09:00] [--ahead 0] [--sink stdout] [--sink file:reminders.log] [--sink desktop] [--once]
+
+Для кожного запису з днем народження один раз обчислюється момент
+найближчого нагадування (дата - ahead днів, о годині --at), і всі
+моменти складаються у купу (heapq). Процес спить до вершини купи, а не
+переглядає книгу щохвилини; після спрацювання у купу повертається
+нагадування на наступний рік. Якщо файл книги змінився, купа
+будується заново.
+
+Нагадування надсилаються у локальні "приймачі" (sinks):
+stdout, file:Path (рядок дописується у файл) та desktop (notify-send,
+якщо він є, інакше дзвінок терміналу та stderr).
+З --once виводяться нагадування на сьогодні і процес завершується
+(для запуску з cron).
+"""
+import argparse
+import heapq
+import shutil
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from .main import open_book, next_birthday
+
+DEFAULT_AT = '09:00'
+CHECK_INTERVAL = 60     # як часто (с) перевіряти зміну файлу книги, поки нічого не спрацьовує
+
+
+def parse_birthday(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def next_fire(birthday, after, at, ahead=0):
+    """(момент нагадування, дата дня народження) - найближче нагадування не раніше after."""
+    day = after.date()
+    while True:
+        occurrence = next_birthday(birthday, day)
+        fire = datetime.combine(occurrence - timedelta(days=ahead), at)
+        if fire >= after:
+            return fire, occurrence
+        day = occurrence + timedelta(days=1)
+
+
+def message(name, birthday, occurrence, today):
+    days = (occurrence - today).days
+    age = occurrence.year - birthday.year
+    age = f' (виповнюється {age})' if age > 0 else ''
+    if days == 0:
+        return f'Сьогодні день народження: {name}{age}!'
+    if days == 1:
+        return f'Завтра день народження: {name}{age}'
+    return f'Через {days} дн. ({occurrence}) день народження: {name}{age}'
+
+
+# --- приймачі нагадувань ---
+
+class StdoutSink:
+    def send(self, title, text):
+        print(f'{datetime.now():%Y-%m-%d %H:%M} {text}', flush=True)
+
+
+class FileSink:
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def send(self, title, text):
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.write(f'{datetime.now():%Y-%m-%d %H:%M}\t{text}\n')
+
+
+class DesktopSink:
+    def __init__(self):
+        self.command = shutil.which('notify-send')
+
+    def send(self, title, text):
+        if self.command:
+            subprocess.run([self.command, title, text], check=False, timeout=10)
+        else:
+            sys.stderr.write(f'\a{title}: {text}\n')
+            sys.stderr.flush()
+
+
+SINKS = {'stdout': StdoutSink, 'file': FileSink, 'desktop': DesktopSink}
+
+
+def make_sink(spec):
+    """'stdout', 'desktop' або 'file:Path'."""
+    kind, _, argument = spec.partition(':')
+    if kind not in SINKS:
+        raise ValueError(f"Невідомий приймач '{spec}'. Доступні: stdout, file:Path, desktop")
+    if kind == 'file':
+        if not argument:
+            raise ValueError("Для приймача file вкажіть шлях: file:reminders.log")
+        return FileSink(argument)
+    return SINKS[kind]()
+
+
+# --- планувальник ---
+
+def _book_mtime(book):
+    file = Path(book.file)
+    if file.is_dir():
+        file = file / 'manifest.json'
+    try:
+        return file.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+class Scheduler:
+    def __init__(self, sinks, at=None, ahead=0, book=None):
+        self.sinks = sinks
+        self.at = at or datetime.strptime(DEFAULT_AT, '%H:%M').time()
+        self.ahead = ahead
+        self.book = book
+        self.heap = []
+        self.mtime = None
+
+    def reload(self, now=None):
+        """Перечитує книгу та будує купу нагадувань, що спрацюють не раніше now."""
+        # щоразу нова книга: AddressBook.load лише доповнює data, і видалені контакти залишились би
+        old, self.book = self.book, open_book(self.book.file if self.book is not None else None)
+        if old is not None and hasattr(old, 'close'):
+            old.close()
+        self.mtime = _book_mtime(self.book)
+        self.book.load()
+        self.build(now or datetime.now())
+
+    def build(self, now):
+        self.heap = []
+        for record in self.book.values():
+            if not record.birthday:
+                continue
+            try:
+                birthday = parse_birthday(record.birthday.value)
+            except ValueError:
+                continue
+            fire, occurrence = next_fire(birthday, now, self.at, self.ahead)
+            self.heap.append((fire, record.name.value, birthday, occurrence))
+        heapq.heapify(self.heap)
+
+    def changed(self):
+        return _book_mtime(self.book) != self.mtime
+
+    def due(self, now):
+        """Знімає з купи нагадування, час яких настав, і ставить наступні (через рік)."""
+        fired = []
+        while self.heap and self.heap[0][0] <= now:
+            fire, name, birthday, occurrence = self.heap[0]
+            fired.append((name, birthday, occurrence))
+            fire, occurrence = next_fire(birthday, fire + timedelta(seconds=1), self.at, self.ahead)
+            heapq.heapreplace(self.heap, (fire, name, birthday, occurrence))
+        return fired
+
+    def notify(self, fired, today):
+        for name, birthday, occurrence in fired:
+            text = message(name, birthday, occurrence, today)
+            for sink in self.sinks:
+                try:
+                    sink.send('День народження', text)
+                except (OSError, subprocess.SubprocessError) as e:
+                    print(f'Не вдалося надіслати нагадування ({type(sink).__name__}): {e}', file=sys.stderr)
+
+    def run(self):
+        woke = datetime.now()
+        self.reload(woke)
+        while True:
+            now = datetime.now()
+            if self.changed():
+                # усе до попереднього пробудження вже надіслано; нагадування між ним і now
+                # мають спрацювати зараз, а не переїхати на наступний рік
+                self.reload(woke + timedelta(microseconds=1))
+            self.notify(self.due(now), now.date())
+            woke = now
+            wait = CHECK_INTERVAL
+            if self.heap:
+                wait = min(wait, max((self.heap[0][0] - now).total_seconds(), 0.0))
+            time.sleep(wait)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='tech_sage remind', description='Нагадування про дні народження')
+    parser.add_argument('--at', default=DEFAULT_AT, help='час нагадування ГГ:ХХ (за замовчуванням 09:00)')
+    parser.add_argument('--ahead', type=int, default=0, help='за скільки днів до дня народження нагадувати')
+    parser.add_argument('--sink', action='append', help='stdout, desktop або file:Path (можна кілька)')
+    parser.add_argument('--once', action='store_true', help='вивести нагадування на сьогодні і завершитись')
+    args = parser.parse_args(argv)
+    try:
+        at = datetime.strptime(args.at, '%H:%M').time()
+        if not 0 <= args.ahead < 366:
+            raise ValueError('--ahead має бути від 0 до 365 днів')
+        sinks = [make_sink(spec) for spec in args.sink or ['stdout']]
+    except ValueError as e:
+        parser.error(str(e))
+
+    scheduler = Scheduler(sinks, at, args.ahead)
+    if args.once:
+        today = date.today()
+        scheduler.reload(datetime.combine(today, datetime.min.time()))
+        scheduler.notify(scheduler.due(datetime.combine(today, datetime.max.time())), today)
+        return
+    try:
+        scheduler.run()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
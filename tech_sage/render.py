@@ -0,0 +1,139 @@
+"""
+Вивід записів книги таблицями.
+
+Рядки таблиць (кортежі вже відформатованих полів) кешуються для
+кожного запису і скидаються Controller'ом при зміні запису
+(invalidate(name)) або всієї книги (invalidate()). Повторний вивід
+великої книги не форматує телефони, e-mail та дати заново.
+
+Якщо stdout - не термінал (вивід перенаправлено у файл чи конвеєр)
+або TECH_SAGE_OUTPUT=tsv, таблиці виводяться як TSV без rich:
+перший рядок - заголовки, далі рядки, поля розділені табуляцією.
+"""
+import os
+import sys
+
+from .main import get_console, Table, NoteRecord
+
+CONTACT_COLUMNS = ('Name', 'Phone', 'Address', 'Email', 'Birthday')
+NAME, PHONE, ADDRESS, EMAIL, BIRTHDAY = range(5)
+
+
+def plain_output():
+    mode = os.environ.get('TECH_SAGE_OUTPUT', '').lower()
+    if mode:
+        return mode == 'tsv'
+    return not sys.stdout.isatty()
+
+
+def tags_text(tags):
+    if not tags:
+        return ''
+    if isinstance(tags, str):
+        return tags
+    return ', '.join(tags)
+
+
+def _tsv_field(value):
+    return value.replace('\t', ' ').replace('\r', ' ').replace('\n', ' ')
+
+
+def _fixed_widths(titles, options, rows):
+    """
+    Якщо таблиця вміщується у ширину консолі, задає колонкам точну ширину
+    без переносу рядків: rich тоді не вимірює кожну клітинку (найдорожча
+    частина виводу великої таблиці).
+    """
+    from rich.cells import cell_len
+    widths = [max(width, option.get('min_width') or 0) for width, option in zip(
+        (max([cell_len(title)] + [cell_len(row[idx]) for row in rows]) for idx, title in enumerate(titles)),
+        options)]
+    # рамка та відступи: 3 символи на колонку + 1
+    if any('width' in option for option in options) or sum(widths) + 3 * len(widths) + 1 > get_console().width:
+        return
+    for width, option in zip(widths, options):
+        option.pop('min_width', None)
+        option.update(width=width, no_wrap=True)
+
+
+def print_table(columns, rows, header=True, sections=True, **style):
+    """
+    columns - назви колонок або пари (назва, параметри rich add_column),
+    rows - кортежі рядків. style - параметри rich Table (header_style, border_style).
+    Повертає кількість виведених рядків.
+    """
+    titles = [column if isinstance(column, str) else column[0] for column in columns]
+    count = 0
+    if plain_output():
+        lines = ['\t'.join(titles)] if header else []
+        for row in rows:
+            lines.append('\t'.join(_tsv_field(value) for value in row))
+            count += 1
+        if lines:
+            sys.stdout.write('\n'.join(lines) + '\n')
+        return count
+
+    rows = list(rows)
+    options = [{} if isinstance(column, str) else dict(column[1]) for column in columns]
+    _fixed_widths(titles, options, rows)
+    table = Table(show_header=header, **style)
+    for title, column_options in zip(titles, options):
+        table.add_column(title, **column_options)
+    for row in rows:
+        table.add_row(*row)
+        if sections:
+            table.add_section()
+        count += 1
+    get_console().print(table)
+    return count
+
+
+class RowCache:
+    """
+    Відформатовані рядки записів: ім'я -> (запис, рядок контакту, рядки нотаток).
+    Для книг, що не тримають записи в пам'яті (SQLite: values() щоразу
+    створює нові об'єкти), кеш вимкнений (enabled=False) - інакше він
+    ніколи не влучав би і накопичив би всю базу.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._rows = {}
+
+    def invalidate(self, name=None):
+        if name is None:
+            self._rows.clear()
+        else:
+            self._rows.pop(name, None)
+
+    def _entry(self, record):
+        if not self.enabled:
+            return [record, None, None]
+        name = record.name.value
+        entry = self._rows.get(name)
+        # запис міг бути замінений іншим об'єктом (undo, load) - тоді рядок застарів
+        if entry is None or entry[0] is not record:
+            entry = [record, None, None]
+            self._rows[name] = entry
+        return entry
+
+    def contact(self, record):
+        """(ім'я, телефони, адреса, e-mail, день народження)."""
+        entry = self._entry(record)
+        if entry[1] is None:
+            entry[1] = (record.name.value,
+                        '; '.join(str(phone) for phone in record.phones),
+                        record.address.value if record.address else '',
+                        record.email.value if record.email else '',
+                        record.birthday.value if record.birthday else '')
+        return entry[1]
+
+    def notes(self, record):
+        """Кортеж (ім'я, текст, дата, теги) для кожної нотатки запису."""
+        if not isinstance(record, NoteRecord):
+            return ()
+        entry = self._entry(record)
+        if entry[2] is None:
+            name = record.name.value
+            entry[2] = tuple((name, note.value, note.date or '', tags_text(note.tags)) for note in record.notes)
+        return entry[2]
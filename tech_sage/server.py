@@ -0,0 +1,371 @@
+"""
+Локальний JSON API над адресною книгою на asyncio (лише стандартна бібліотека).
+
+    tech_sage serve [--host 127.0.0.1] [--port 8080] [--autosave 5]
+
+Ендпоінти:
+    GET    /contacts?term=&limit=&offset=   список або пошук (find_by_term)
+    GET    /contacts/{name}                 один контакт
+    POST   /contacts                        створення (JSON як у export .jsonl)
+    PUT    /contacts/{name}                 заміна контакту
+    DELETE /contacts/{name}                 видалення
+    GET    /query?q=phone:067*+tag:work     запит мовою команди query
+    GET    /birthdays?days=7                дні народження впродовж N днів
+    POST   /batch                           список {"method", "path", "body"} в одному запиті
+    POST   /save                            негайне збереження книги
+
+Читання виконуються у пулі потоків під спільним блокуванням, записи -
+ексклюзивно, тож довге читання не зупиняє цикл подій. Але читання - це
+код на Python, який тримає GIL, тому одночасно на кількох ядрах вони не
+йдуть: пошук /contacts?term= перебирає всю книгу і на 20 тис. контактів
+змішане навантаження benchmarks/load_test дає лише близько 40 запитів/с
+з p99 понад секунду. /query (name:, phone:, email:, birthday) та
+/birthdays відповідають індексом і на великих книгах значно швидші.
+Зміни зберігаються у файл не на кожен запит, а раз на --autosave секунд
+та при зупинці сервера.
+
+Помилка обробника, що не є HTTPError, повертається як 500 з JSON
+{"error": ...}, а трасування пишеться у stderr.
+"""
+import argparse
+import asyncio
+import json
+import traceback
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from .exchange import record_to_row, row_to_record
+from .main import open_book
+from .query import Filter, Query, parse, execute, make_index
+
+MAX_BODY = 16 * 1024 * 1024
+DEFAULT_LIMIT = 100
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ReadWriteLock:
+    """Багато читачів або один письменник; письменник, що чекає, має пріоритет."""
+
+    def __init__(self):
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire_read(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: not self._writer and not self._waiting_writers)
+            self._readers += 1
+
+    async def release_read(self):
+        async with self._condition:
+            self._readers -= 1
+            self._condition.notify_all()
+
+    async def acquire_write(self):
+        async with self._condition:
+            self._waiting_writers += 1
+            try:
+                await self._condition.wait_for(lambda: not self._writer and not self._readers)
+            finally:
+                self._waiting_writers -= 1
+            self._writer = True
+
+    async def release_write(self):
+        async with self._condition:
+            self._writer = False
+            self._condition.notify_all()
+
+
+class BookService:
+    """Операції над книгою. Методи read_* не змінюють книгу, write_* - змінюють."""
+
+    def __init__(self, book):
+        self.book = book
+        self.dirty = False
+        self._index = None
+
+    def _changed(self):
+        self.dirty = True
+        self._index = None
+
+    def _get(self, name):
+        record = self.book.get(name)
+        if record is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Контакт '{name}' не знайдено")
+        return record
+
+    @staticmethod
+    def _page(records, params):
+        try:
+            limit = int(params.get('limit', DEFAULT_LIMIT))
+            offset = int(params.get('offset', 0))
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, 'limit та offset мають бути числами')
+        result = []
+        for idx, record in enumerate(records):
+            if idx < offset:
+                continue
+            if len(result) >= limit:
+                break
+            result.append(record_to_row(record))
+        return result
+
+    def read_contacts(self, params):
+        term = params.get('term')
+        records = self.book.find_by_term(term) if term else self.book.data.values()
+        if term:
+            # find_by_term повертає запис стільки разів, скільки полів збіглося
+            records = list({record.name.value: record for record in records}.values())
+        return self._page(records, params)
+
+    def read_contact(self, name):
+        return record_to_row(self._get(name))
+
+    def _index_for_query(self):
+        if self._index is None:
+            self._index = make_index(self.book)
+        return self._index
+
+    def read_query(self, params):
+        try:
+            query = parse(params.get('q', ''))
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(e))
+        return self._page(execute(self.book, query, self._index_for_query()), params)
+
+    def read_birthdays(self, params):
+        days = params.get('days', '7')
+        if not days.isdigit():
+            raise HTTPError(HTTPStatus.BAD_REQUEST, 'days має бути невід\'ємним числом')
+        query = Query([Filter('birthday', '<', f'{int(days) + 1}d')])
+        result = []
+        for record in execute(self.book, query, self._index_for_query()):
+            row = record_to_row(record)
+            row['days_to_birthday'] = record.days_to_birthday()
+            result.append(row)
+        result.sort(key=lambda row: (row['days_to_birthday'], row['name']))
+        return result
+
+    def _record_from(self, body, name=None):
+        if not isinstance(body, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, 'Очікується JSON-об\'єкт контакту')
+        if name is not None:
+            body = {**body, 'name': name}
+        try:
+            return row_to_record(body)
+        except (ValueError, IndexError, TypeError, AttributeError) as e:
+            raise HTTPError(HTTPStatus.UNPROCESSABLE_ENTITY, str(e))
+
+    def write_create(self, body):
+        record = self._record_from(body)
+        if record.name.value in self.book:
+            raise HTTPError(HTTPStatus.CONFLICT, f"Контакт '{record.name.value}' вже існує")
+        self.book.add_record(record)
+        self._changed()
+        return record_to_row(record)
+
+    def write_replace(self, name, body):
+        record = self._record_from(body, name)
+        self.book.add_record(record)
+        self._changed()
+        return record_to_row(record)
+
+    def write_delete(self, name):
+        self.book.delete_record(self._get(name))
+        self._changed()
+        return {'deleted': name}
+
+    def write_save(self):
+        self.book.dump()
+        self.dirty = False
+        return {'saved': True}
+
+
+class Server:
+    def __init__(self, book, autosave=5.0):
+        self.service = BookService(book)
+        self.lock = ReadWriteLock()
+        self.autosave = autosave
+        # з'єднання SQLite не можна використовувати з пулу потоків
+        self.parallel_reads = getattr(book, 'thread_safe', True)
+
+    def route(self, method, path, params, body):
+        """Повертає (вид операції 'read'/'write'/'batch', функція без аргументів, статус успіху)."""
+        parts = [unquote(part) for part in path.strip('/').split('/') if part]
+        service = self.service
+        if parts == ['contacts']:
+            if method == 'GET':
+                return 'read', lambda: service.read_contacts(params), HTTPStatus.OK
+            if method == 'POST':
+                return 'write', lambda: service.write_create(body), HTTPStatus.CREATED
+        elif len(parts) == 2 and parts[0] == 'contacts':
+            name = parts[1]
+            if method == 'GET':
+                return 'read', lambda: service.read_contact(name), HTTPStatus.OK
+            if method == 'PUT':
+                return 'write', lambda: service.write_replace(name, body), HTTPStatus.OK
+            if method == 'DELETE':
+                return 'write', lambda: service.write_delete(name), HTTPStatus.OK
+        elif parts == ['query'] and method == 'GET':
+            return 'read', lambda: service.read_query(params), HTTPStatus.OK
+        elif parts == ['birthdays'] and method == 'GET':
+            return 'read', lambda: service.read_birthdays(params), HTTPStatus.OK
+        elif parts == ['save'] and method == 'POST':
+            return 'write', service.write_save, HTTPStatus.OK
+        elif parts == ['batch'] and method == 'POST':
+            return 'batch', None, HTTPStatus.OK
+        else:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f'Невідомий шлях {path}')
+        raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f'{method} не підтримується для {path}')
+
+    async def call(self, method, target, body):
+        """Виконує один запит. Повертає (статус, результат)."""
+        url = urlsplit(target)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        kind, func, status = self.route(method, url.path, params, body)
+        if kind == 'batch':
+            return status, await self.batch(body)
+        if kind == 'read':
+            await self.lock.acquire_read()
+            try:
+                if self.parallel_reads:
+                    return status, await asyncio.get_running_loop().run_in_executor(None, func)
+                return status, func()
+            finally:
+                await self.lock.release_read()
+        await self.lock.acquire_write()
+        try:
+            return status, func()
+        finally:
+            await self.lock.release_write()
+
+    async def batch(self, requests):
+        if not isinstance(requests, list):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, 'Очікується список запитів')
+        responses = []
+        for request in requests:
+            try:
+                status, result = await self.call(request.get('method', 'GET').upper(), request['path'],
+                                                 request.get('body'))
+                responses.append({'status': int(status), 'body': result})
+            except HTTPError as e:
+                responses.append({'status': int(e.status), 'body': {'error': str(e)}})
+            except (KeyError, AttributeError):
+                responses.append({'status': 400, 'body': {'error': 'Кожен запит має містити path'}})
+            except Exception as e:
+                traceback.print_exc()
+                responses.append({'status': 500, 'body': {'error': f'Внутрішня помилка: {e}'}})
+        return responses
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self.respond(writer, HTTPStatus.BAD_REQUEST, {'error': 'Некоректний запит'}, False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+                keep_alive = (version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close') \
+                    or headers.get('connection', '').lower() == 'keep-alive'
+
+                try:
+                    length = int(headers.get('content-length') or 0)
+                    if length < 0:
+                        raise ValueError
+                except ValueError:
+                    # без коректної довжини не відомо, де закінчується тіло - з'єднання закривається
+                    await self.respond(writer, HTTPStatus.BAD_REQUEST, {'error': 'Некоректний Content-Length'}, False)
+                    break
+                if length > MAX_BODY:
+                    await self.respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {'error': 'Завеликий запит'}, False)
+                    break
+                raw = await reader.readexactly(length) if length else b''
+                try:
+                    body = json.loads(raw) if raw else None
+                    status, result = await self.call(method.upper(), target, body)
+                except json.JSONDecodeError:
+                    status, result = HTTPStatus.BAD_REQUEST, {'error': 'Тіло запиту має бути JSON'}
+                except HTTPError as e:
+                    status, result = e.status, {'error': str(e)}
+                except Exception as e:
+                    traceback.print_exc()
+                    status, result = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': f'Внутрішня помилка: {e}'}
+                await self.respond(writer, status, result, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def respond(writer, status, result, keep_alive):
+        payload = json.dumps(result, ensure_ascii=False).encode('utf-8')
+        writer.write(f'HTTP/1.1 {status.value} {status.phrase}\r\n'
+                     f'Content-Type: application/json; charset=utf-8\r\n'
+                     f'Content-Length: {len(payload)}\r\n'
+                     f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'.encode('latin-1') + payload)
+        await writer.drain()
+
+    async def autosave_loop(self):
+        # записи групуються: файл перезаписується не частіше ніж раз на autosave секунд
+        while True:
+            await asyncio.sleep(self.autosave)
+            if self.service.dirty:
+                await self.lock.acquire_write()
+                try:
+                    # збереження великої книги не блокує цикл подій (розбір запитів, інші з'єднання);
+                    # з'єднання SQLite прив'язане до потоку, тому така книга зберігається у циклі
+                    if self.parallel_reads:
+                        await asyncio.get_running_loop().run_in_executor(None, self.service.write_save)
+                    else:
+                        self.service.write_save()
+                finally:
+                    await self.lock.release_write()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f'Tech Sage API: http://{host}:{port}  (Ctrl+C - зупинка)')
+        saver = asyncio.create_task(self.autosave_loop())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            saver.cancel()
+            if self.service.dirty:
+                self.service.write_save()
+                print('Адресна книга збережена!')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='tech_sage serve', description='Локальний JSON API адресної книги')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--autosave', type=float, default=5.0, help='інтервал збереження змін, секунд')
+    args = parser.parse_args(argv)
+
+    book = open_book()
+    book.load()
+    try:
+        asyncio.run(Server(book, args.autosave).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if hasattr(book, 'close'):
+            book.close()
@@ -0,0 +1,258 @@
+"""
+Адресна книга, розбита на шарди за хешем імені.
+
+    TECH_SAGE_BOOK=adress_book_1.shards tech_sage
+
+Книга зберігається у папці: manifest.json (кількість шардів, record_id)
+та shard-00.tss ... shard-NN.tss у форматі знімка (tech_sage/snapshot.py).
+Запис потрапляє у шард crc32(ім'я) % кількість шардів.
+
+- dump() перезаписує лише шарди зі змінами; шарди стискаються та
+  пишуться у пулі потоків (zlib і файлові операції відпускають GIL);
+- load() читає та розпаковує шарди у пулі потоків;
+- find_by_term() та find_notes_by_term() на великих книгах сканують
+  незмінені шарди у процесах: кожен процес закріплений за своєю групою
+  шардів (шард idx -> процес idx % кількість процесів), сам читає їх
+  з диска, кешує і повертає лише імена, тож записи не передаються між
+  процесами, а разом процеси тримають одну копію книги, а не по копії
+  кожен. Шарди зі змінами скануються у поточному процесі.
+
+Зміни відстежуються через touch(name), який Controller та History
+викликають перед зміною запису, а також add_record/delete_record.
+
+Перетворення існуючої книги (.pkl або .tss):
+    python -m tech_sage.sharded_book adress_book_1.pkl adress_book_1.shards [--shards 8]
+"""
+import json
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+from .main import AddressBook, NoteRecord, METRICS
+from .snapshot import dump_snapshot, load_snapshot
+
+DEFAULT_SHARDS = 8
+MANIFEST = 'manifest.json'
+PARALLEL_MIN = 20000  # меншу книгу швидше переглянути в одному процесі, ніж роздати процесам
+
+
+def shard_of(name, shards):
+    return zlib.crc32(name.encode('utf-8', 'surrogatepass')) % shards
+
+
+def _workers(shards):
+    return max(1, min(shards, os.cpu_count() or 1))
+
+
+def _load_shard(file):
+    """Повертає (mtime_ns, записи шарду) або (None, {}), якщо файлу немає."""
+    try:
+        mtime = file.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None, {}
+    return mtime, load_snapshot(file)[1]
+
+
+# --- виконуються у процесах; кожен процес кешує лише шарди своєї групи ---
+
+_worker_shards = {}
+
+
+def _worker_shard(file, mtime):
+    cached = _worker_shards.get(file)
+    if cached is None or cached[0] != mtime:
+        cached = _worker_shards[file] = (mtime, load_snapshot(file)[1])
+    return cached[1]
+
+
+def _scan_terms(file, mtime, term):
+    shard = AddressBook(file)
+    shard.data = _worker_shard(file, mtime)
+    return [record.name.value for record in shard._find_by_term(term)]
+
+
+def _scan_notes(file, mtime, term):
+    # нотатки повертаються як (ім'я, номер нотатки у записі)
+    result = []
+    for name, record in _worker_shard(file, mtime).items():
+        if isinstance(record, NoteRecord):
+            found = {id(note) for note in record.find_notes_by_term(term)}
+            result.extend((name, idx) for idx, note in enumerate(record.notes) if id(note) in found)
+    return result
+
+
+class ShardedAddressBook(AddressBook):
+
+    def __init__(self, file="adress_book_1.shards", shards=DEFAULT_SHARDS):
+        super().__init__(file)
+        self.shards = shards
+        manifest = self.file / MANIFEST
+        if manifest.exists():
+            with open(manifest, encoding='utf-8') as stream:
+                self.shards = json.load(stream)['shards']
+        self.names = [set() for _ in range(self.shards)]    # імена кожного шарду
+        self.dirty = set(range(self.shards))                # шарди, які треба записати
+        self.mtimes = {}                                    # шард -> mtime_ns файлу на диску
+        self._pools = None      # по одному процесу на групу шардів
+
+    def shard_file(self, idx):
+        return self.file / f'shard-{idx:02d}.tss'
+
+    def touch(self, name):
+        idx = shard_of(name, self.shards)
+        self.names[idx].add(name)
+        self.dirty.add(idx)
+
+    def add_record(self, record):
+        self.touch(record.name.value)
+        super().add_record(record)
+
+    def add_records(self, records):
+        for record in records:
+            self.touch(record.name.value)
+        super().add_records(records)
+
+    def delete_record(self, name):
+        self.touch(name.name.value)
+        super().delete_record(name)
+
+    def dump(self):
+        with METRICS.timed('book.dump') as timing:
+            self.file.mkdir(parents=True, exist_ok=True)
+            parts = {idx: {} for idx in self.dirty}
+            for idx, part in parts.items():
+                names = self.names[idx] = {name for name in self.names[idx] if name in self.data}
+                part.update((name, self.data[name]) for name in sorted(names))
+
+            def write(item):
+                idx, part = item
+                dump_snapshot(self.shard_file(idx), part, self.record_id)
+                return idx, self.shard_file(idx).stat().st_mtime_ns
+
+            with ThreadPoolExecutor(max_workers=_workers(len(parts))) as executor:
+                self.mtimes.update(executor.map(write, parts.items()))
+            with open(self.file / MANIFEST, 'w', encoding='utf-8') as stream:
+                json.dump({'shards': self.shards, 'record_id': self.record_id}, stream)
+            self.dirty.clear()
+            timing.records = sum(len(part) for part in parts.values())
+
+    def load(self):
+        manifest = self.file / MANIFEST
+        if not manifest.exists():
+            self._load_legacy()
+            return
+        with METRICS.timed('book.load') as timing:
+            with open(manifest, encoding='utf-8') as stream:
+                self.record_id = json.load(stream).get('record_id', 0)
+            files = [self.shard_file(idx) for idx in range(self.shards)]
+            # записи мають опинитись в об'єктах цього процесу, тож читання у процесах
+            # означало б ще один pickle туди й назад; потоки паралелять читання та zlib
+            with ThreadPoolExecutor(max_workers=_workers(self.shards)) as executor:
+                for idx, (mtime, part) in enumerate(executor.map(_load_shard, files)):
+                    self.data.update(part)
+                    if mtime is not None:
+                        self.mtimes[idx] = mtime
+                    # шард чистий, лише якщо в пам'яті немає записів, яких немає на диску
+                    if mtime is not None and self.names[idx] <= part.keys():
+                        self.dirty.discard(idx)
+                    else:
+                        self.dirty.add(idx)
+                    self.names[idx] |= part.keys()
+            timing.records = len(self.data)
+
+    def _load_legacy(self):
+        # поки шарди не збережено, читаємо книгу з тим самим іменем у форматі .tss або .pkl
+        for suffix in ('.tss', '.pkl'):
+            legacy = self.file.with_suffix(suffix)
+            if legacy.exists():
+                book = AddressBook(legacy)
+                book.load()
+                self.record_id = book.record_id
+                for name, record in book.data.items():
+                    self.data[name] = record
+                    self.touch(name)
+                return
+
+    def _pools_for(self, records):
+        workers = _workers(self.shards)
+        if records < PARALLEL_MIN or workers < 2:
+            return None
+        if self._pools is None:
+            self._pools = [ProcessPoolExecutor(max_workers=1) for _ in range(workers)]
+        return self._pools
+
+    def _scan(self, worker, term):
+        """Запускає worker на незмінених шардах. Повертає (результати по шардах, шарди для локального перегляду)."""
+        pools = self._pools_for(len(self.data))
+        if pools is None:
+            return None, range(self.shards)
+        futures = {}
+        for idx in range(self.shards):
+            if idx not in self.dirty and idx in self.mtimes:
+                # шард завжди йде в той самий процес, тож його кеш є лише в одному з них
+                futures[idx] = pools[idx % len(pools)].submit(worker, str(self.shard_file(idx)), self.mtimes[idx], term)
+        return futures, [idx for idx in range(self.shards) if idx not in futures]
+
+    def _local(self, shards):
+        local = AddressBook(self.file)
+        if len(shards) == self.shards:
+            local.data = self.data
+        else:
+            local.data = {name: self.data[name] for idx in shards for name in self.names[idx] if name in self.data}
+        return local
+
+    def find_by_term(self, term):
+        with METRICS.timed('book.find_by_term') as timing:
+            timing.records = len(self.data)
+            futures, shards = self._scan(_scan_terms, term)
+            result = self._local(shards)._find_by_term(term) if shards else []
+            for future in (futures or {}).values():
+                result.extend(self.data[name] for name in future.result())
+            return result
+
+    def find_notes_by_term(self, term):
+        with METRICS.timed('book.find_notes_by_term') as timing:
+            timing.records = len(self.data)
+            futures, shards = self._scan(_scan_notes, term)
+            result = []
+            if shards:
+                for name, record in self._local(shards).data.items():
+                    if isinstance(record, NoteRecord):
+                        result.extend((name, note) for note in record.find_notes_by_term(term))
+            for future in (futures or {}).values():
+                result.extend((name, self.data[name].notes[idx]) for name, idx in future.result())
+            return result
+
+    def close(self):
+        """Зупиняє процеси пошуку; наступний пошук за потреби створить їх знову."""
+        pools, self._pools = self._pools, None
+        for pool in pools or ():
+            pool.shutdown()
+
+
+def migrate(source, target, shards=DEFAULT_SHARDS):
+    """Перетворює книгу .pkl/.tss у шардовану. Повертає кількість записів."""
+    book = AddressBook(source)
+    book.load()
+    sharded = ShardedAddressBook(target, shards)
+    sharded.record_id = book.record_id
+    sharded.add_records(list(book.data.values()))
+    sharded.dump()
+    return len(book.data)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Перетворення адресної книги у шардовану')
+    parser.add_argument('source', help='файл книги .pkl або .tss')
+    parser.add_argument('target', nargs='?', help="папка книги (за замовчуванням - те саме ім'я з .shards)")
+    parser.add_argument('--shards', type=int, default=DEFAULT_SHARDS)
+    args = parser.parse_args()
+    target = args.target or Path(args.source).with_suffix('.shards')
+    count = migrate(args.source, target, args.shards)
+    print(f"Записано {count} контактів у {args.shards} шардів у '{target}'")
+
+
+if __name__ == '__main__':
+    main()
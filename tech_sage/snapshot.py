@@ -0,0 +1,253 @@
+"""
+Компактний колонковий формат знімка адресної книги (.tss).
+
+Замість pickle графа об'єктів Record/NoteRecord книга зберігається як
+набір колонок: рядкові колонки - масив зміщень + один utf-8 блок,
+числові - масиви array. Опис колонок (схема) записується у заголовок,
+тому файл не залежить від внутрішньої будови класів Field, а нові
+колонки можна додавати без поломки старих файлів.
+
+Структура файлу:
+    MAGIC (6 байт) | версія формату (uint16) | стиснення (uint8) | тіло
+    тіло (стиснуте zlib/lzma або ні):
+        довжина заголовка (uint32) | заголовок JSON | колонки одна за одною
+
+Завантаження відновлює об'єкти напряму, без повторної валідації
+полів (дані перевірялись при записі) і з вимкненим gc, тому воно
+у кілька разів швидше за pickle.load.
+
+Міграція зі старого pickle:
+    python -m tech_sage.snapshot adress_book_1.pkl adress_book_1.tss [--compression lzma]
+"""
+import gc
+import json
+import struct
+import sys
+from array import array
+from itertools import accumulate
+from pathlib import Path
+
+from .main import Record, NoteRecord, Name, Phone, Email, Address, Birthday, Note
+
+MAGIC = b'TSSNAP'
+FORMAT_VERSION = 1
+PREAMBLE = struct.Struct('<HB')
+HEADER_SIZE = struct.Struct('<I')
+
+COMPRESSION = {'none': 0, 'zlib': 1, 'lzma': 2}
+DEFAULT_COMPRESSION = 'zlib'
+
+HAS_EMAIL, HAS_ADDRESS, HAS_BIRTHDAY = 1, 2, 4
+TAGS_SEPARATOR = '\x1f'
+
+
+def _compress(body, method):
+    if method == 'zlib':
+        import zlib
+        return zlib.compress(body, 1)
+    if method == 'lzma':
+        import lzma
+        return lzma.compress(body)
+    return body
+
+
+def _decompress(body, code):
+    if code == COMPRESSION['zlib']:
+        import zlib
+        return zlib.decompress(body)
+    if code == COMPRESSION['lzma']:
+        import lzma
+        return lzma.decompress(body)
+    return body
+
+
+def _int_array(typecode, values):
+    numbers = array(typecode, values)
+    if sys.byteorder == 'big':
+        numbers.byteswap()
+    return numbers
+
+
+def _encode_str(values):
+    offsets = _int_array('I', accumulate((len(value) for value in values), initial=0))
+    return offsets.tobytes() + ''.join(values).encode('utf-8', 'surrogatepass')
+
+
+def _decode_str(buffer, count):
+    split = 4 * (count + 1)
+    offsets = array('I')
+    offsets.frombytes(buffer[:split])
+    if sys.byteorder == 'big':
+        offsets.byteswap()
+    text = bytes(buffer[split:]).decode('utf-8', 'surrogatepass')
+    return [text[start:end] for start, end in zip(offsets, offsets[1:])]
+
+
+def _decode_int(buffer, typecode):
+    numbers = array(typecode)
+    numbers.frombytes(buffer)
+    if sys.byteorder == 'big':
+        numbers.byteswap()
+    return numbers
+
+
+def _columns(data):
+    names, kinds, flags, emails, addresses, birthdays = [], [], [], [], [], []
+    phone_counts, phones = [], []
+    note_counts, note_texts, note_tags, note_tag_kinds, note_dates = [], [], [], [], []
+
+    for record in data.values():
+        names.append(record.name.value)
+        kinds.append(1 if isinstance(record, NoteRecord) else 0)
+        flags.append((HAS_EMAIL if record.email else 0) | (HAS_ADDRESS if record.address else 0)
+                     | (HAS_BIRTHDAY if record.birthday else 0))
+        emails.append(record.email.value if record.email else '')
+        addresses.append(record.address.value if record.address else '')
+        birthdays.append(record.birthday.value if record.birthday else '')
+        phone_counts.append(len(record.phones))
+        phones.extend(phone.value for phone in record.phones)
+        notes = getattr(record, 'notes', [])
+        note_counts.append(len(notes))
+        for note in notes:
+            note_texts.append(note.value)
+            tags = note.tags if note.tags is not None else ''
+            if isinstance(tags, str):
+                note_tag_kinds.append(0)
+                note_tags.append(tags)
+            else:
+                note_tag_kinds.append(1)
+                note_tags.append(TAGS_SEPARATOR.join(tags))
+            note_dates.append(note.date)
+
+    return [('names', 'str', names), ('kinds', 'B', kinds), ('flags', 'B', flags),
+            ('emails', 'str', emails), ('addresses', 'str', addresses), ('birthdays', 'str', birthdays),
+            ('phone_counts', 'I', phone_counts), ('phones', 'str', phones),
+            ('note_counts', 'I', note_counts), ('note_texts', 'str', note_texts),
+            ('note_tags', 'str', note_tags), ('note_tag_kinds', 'B', note_tag_kinds),
+            ('note_dates', 'str', note_dates)]
+
+
+def dump_snapshot(file, data, record_id=0, compression=DEFAULT_COMPRESSION):
+    if compression not in COMPRESSION:
+        raise ValueError(f"Невідомий метод стиснення '{compression}'. Доступні: {', '.join(COMPRESSION)}")
+    schema, sections = [], []
+    for name, kind, values in _columns(data):
+        payload = _encode_str(values) if kind == 'str' else _int_array(kind, values).tobytes()
+        schema.append({'name': name, 'type': kind, 'count': len(values), 'size': len(payload)})
+        sections.append(payload)
+    header = json.dumps({'record_id': record_id, 'records': len(data), 'columns': schema}).encode('utf-8')
+    body = b''.join([HEADER_SIZE.pack(len(header)), header, *sections])
+
+    with open(file, 'wb') as stream:
+        stream.write(MAGIC)
+        stream.write(PREAMBLE.pack(FORMAT_VERSION, COMPRESSION[compression]))
+        stream.write(_compress(body, compression))
+
+
+def is_snapshot(file):
+    try:
+        with open(file, 'rb') as stream:
+            return stream.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def _read_columns(file):
+    with open(file, 'rb') as stream:
+        if stream.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"'{file}' не є знімком адресної книги")
+        version, compression = PREAMBLE.unpack(stream.read(PREAMBLE.size))
+        if version > FORMAT_VERSION:
+            raise ValueError(f'Версія знімка {version} новіша за підтримувану ({FORMAT_VERSION})')
+        body = memoryview(_decompress(stream.read(), compression))
+
+    (header_size,) = HEADER_SIZE.unpack(body[:HEADER_SIZE.size])
+    position = HEADER_SIZE.size + header_size
+    header = json.loads(bytes(body[HEADER_SIZE.size:position]))
+    columns = {}
+    for column in header['columns']:
+        buffer = body[position:position + column['size']]
+        position += column['size']
+        if column['type'] == 'str':
+            columns[column['name']] = _decode_str(buffer, column['count'])
+        else:
+            columns[column['name']] = _decode_int(buffer, column['type'])
+    return header, columns
+
+
+def _field(cls, value):
+    field = object.__new__(cls)
+    field._value = value
+    return field
+
+
+def load_snapshot(file):
+    """Повертає (record_id, dict ім'я -> запис)."""
+    header, columns = _read_columns(file)
+    count = header['records']
+    names = columns['names']
+    kinds = columns.get('kinds') or [1] * count
+    flags = columns['flags']
+    emails, addresses, birthdays = columns['emails'], columns['addresses'], columns['birthdays']
+    phone_counts, phones = columns['phone_counts'], columns['phones']
+    note_counts = columns.get('note_counts') or [0] * count
+    note_texts, note_tags = columns.get('note_texts', []), columns.get('note_tags', [])
+    note_tag_kinds, note_dates = columns.get('note_tag_kinds', []), columns.get('note_dates', [])
+
+    new = object.__new__
+    data = {}
+    phone_pos = note_pos = 0
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for idx in range(count):
+            record = new(NoteRecord if kinds[idx] else Record)
+            name = names[idx]
+            flag = flags[idx]
+            record.name = _field(Name, name)
+            end = phone_pos + phone_counts[idx]
+            record.phones = [_field(Phone, phone) for phone in phones[phone_pos:end]]
+            phone_pos = end
+            record.email = _field(Email, emails[idx]) if flag & HAS_EMAIL else None
+            record.address = _field(Address, addresses[idx]) if flag & HAS_ADDRESS else None
+            record.birthday = _field(Birthday, birthdays[idx]) if flag & HAS_BIRTHDAY else None
+            if kinds[idx]:
+                notes = []
+                for pos in range(note_pos, note_pos + note_counts[idx]):
+                    note = _field(Note, note_texts[pos])
+                    tags = note_tags[pos]
+                    note.tags = (tags.split(TAGS_SEPARATOR) if tags else []) if note_tag_kinds[pos] else tags
+                    note.date = note_dates[pos]
+                    notes.append(note)
+                record.notes = notes
+            note_pos += note_counts[idx]
+            data[name] = record
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return header.get('record_id', 0), data
+
+
+def migrate(source, target, compression=DEFAULT_COMPRESSION):
+    """Перетворює pickle-файл книги у знімок. Повертає кількість записів."""
+    import pickle
+    with open(source, 'rb') as stream:
+        record_id, data = pickle.load(stream)
+    dump_snapshot(target, data, record_id, compression)
+    return len(data)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Міграція адресної книги з pickle у формат знімка .tss')
+    parser.add_argument('source', help='pickle-файл книги, напр. adress_book_1.pkl')
+    parser.add_argument('target', nargs='?', help='файл знімка (за замовчуванням - те саме ім\'я з .tss)')
+    parser.add_argument('--compression', choices=list(COMPRESSION), default=DEFAULT_COMPRESSION)
+    args = parser.parse_args()
+    target = args.target or Path(args.source).with_suffix('.tss')
+    count = migrate(args.source, target, args.compression)
+    print(f"Записано {count} контактів у '{target}'")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Визначення типу файлу за вмістом (магічними байтами) для sort_files.
+
+Читаються лише перші HEAD_SIZE байтів файлу у буфер, який повторно
+використовується (свій для кожного потоку), без буферизації Python:
+readinto не виділяє пам'ять під кожен файл.
+Результат кешується за (пристрій, inode, mtime), тож другий прохід
+сортування (файл лише перейменовано) не читає файл повторно. Якщо
+сигнатуру не впізнано, sort_files визначає тип за розширенням.
+"""
+import os
+import threading
+
+HEAD_SIZE = 512     # tar має сигнатуру на зміщенні 257
+CACHE_SIZE = 100000
+# zip без ознак документа у першому записі: це може бути і архів, і DOCX/XLSX,
+# збережений openpyxl чи LibreOffice (першим йде docProps/ або _rels/) -
+# категорію уточнює розширення файлу
+ZIP_CONTAINER = 'zip'
+
+# (зміщення, сигнатура, категорія) - перевіряються по черзі
+SIGNATURES = [
+    (0, b'\xff\xd8\xff', 'images'),
+    (0, b'\x89PNG\r\n\x1a\n', 'images'),
+    (0, b'GIF87a', 'images'),
+    (0, b'GIF89a', 'images'),
+    (0, b'%PDF-', 'documents'),
+    (0, b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'documents'),    # DOC/XLS/PPT (OLE2)
+    (0, b'{\\rtf', 'documents'),
+    (0, b'\x1a\x45\xdf\xa3', 'video'),  # MKV/WebM
+    (0, b'ID3', 'audio'),
+    (0, b'OggS', 'audio'),
+    (0, b'fLaC', 'audio'),
+    (0, b'#!AMR', 'audio'),
+    (0, b'\x1f\x8b', 'archives'),       # gzip
+    (0, b'BZh', 'archives'),
+    (0, b'\xfd7zXZ\x00', 'archives'),
+    (0, b'7z\xbc\xaf\x27\x1c', 'archives'),
+    (0, b'Rar!\x1a\x07', 'archives'),
+    (257, b'ustar', 'archives'),
+]
+
+_local = threading.local()
+_cache = {}
+
+
+def _buffer():
+    buffer = getattr(_local, 'buffer', None)
+    if buffer is None:
+        buffer = _local.buffer = bytearray(HEAD_SIZE)
+    return buffer
+
+
+def _zip(head):
+    # DOCX/XLSX/PPTX та ODF - теж zip, але першим записом у них йде опис формату
+    name = head[30:30 + 19]
+    if name.startswith(b'[Content_Types].xml') or name.startswith(b'mimetype') or name.startswith(b'word/'):
+        return 'documents'
+    return ZIP_CONTAINER
+
+
+def _riff(head):
+    kind = head[8:12]
+    if kind == b'WAVE':
+        return 'audio'
+    if kind == b'AVI ':
+        return 'video'
+    if kind == b'WEBP':
+        return 'images'
+    return None
+
+
+def _mpeg(head):
+    if head[4:8] == b'ftyp':
+        brand = head[8:12]
+        if brand in (b'M4A ', b'M4B '):
+            return 'audio'
+        if brand in (b'heic', b'heix', b'avif', b'mif1'):
+            return 'images'
+        return 'video'      # mp4, mov (qt  ), 3gp
+    if len(head) > 2 and head[0] == 0xff and head[1] & 0xe0 == 0xe0 and head[1] & 0x06 and head[2] >> 4 != 0xf:
+        return 'audio'      # заголовок кадру MPEG audio (MP3 без тегу ID3)
+    return None
+
+
+def _svg(head):
+    text = head.lstrip(b'\xef\xbb\xbf \t\r\n').lower()
+    if text.startswith(b'<svg') or (text.startswith(b'<?xml') and b'<svg' in text):
+        return 'images'
+    return None
+
+
+def classify_head(head):
+    """Категорія за першими байтами файлу, ZIP_CONTAINER або None, якщо сигнатура невідома."""
+    if head[:4] == b'PK\x03\x04':
+        return _zip(head)
+    if head[:4] == b'RIFF':
+        return _riff(head)
+    for offset, signature, category in SIGNATURES:
+        if head[offset:offset + len(signature)] == signature:
+            return category
+    return _mpeg(head) or _svg(head)
+
+
+def sniff(file, stat=None):
+    """Категорія файлу за вмістом або None. stat - вже отриманий os.stat файлу, якщо є."""
+    stat = stat or os.stat(file)
+    key = (stat.st_dev, stat.st_ino, stat.st_mtime_ns)
+    if key in _cache:
+        return _cache[key]
+    buffer = _buffer()
+    try:
+        with open(file, 'rb', buffering=0) as stream:
+            size = stream.readinto(buffer)
+    except OSError:
+        return None
+    category = classify_head(bytes(memoryview(buffer)[:size])) if size else None
+    if len(_cache) >= CACHE_SIZE:
+        _cache.clear()
+    _cache[key] = category
+    return category
@@ -1,7 +1,12 @@
+import os
 import sys
 import shutil
 from pathlib import Path
 from .normalize_for_sort import normalize
+from .transfer import Mover, parse_rate
+from .sort_progress import SortProgress, SUMMARY_NAME
+from .sniff import sniff, ZIP_CONTAINER
+from functools import partial
 from rich.console import Console
 from rich.table import Table
 
@@ -26,6 +31,15 @@ PATH = 0 #Path(sys.argv [1])
 all_files = []
 suff_used_known = set ()
 suff_used_unknown = set()
+archives_moved = [] # (архів до переміщення, архів після, папка для розпакування)
+
+# копіювання між дисками (коли підпапка - інша файлова система):
+# кількість потоків та обмеження швидкості, напр. TECH_SAGE_SORT_RATE=50M
+MOVE_WORKERS = 4
+RATE_LIMIT = os.environ.get('TECH_SAGE_SORT_RATE')
+# визначати тип за вмістом файлу (перші байти), а не лише за розширенням:
+# допомагає з файлами без розширення або з неправильним розширенням
+CONTENT_SNIFFING = os.environ.get('TECH_SAGE_SORT_SNIFF', '') == '1'
 
 # функція визначення типу файлу, виходячи зі словника
 # визначає по розширенню файлу з крапкою перед ним ".ХХХ"
@@ -39,6 +53,19 @@ def filetype (suffix):
     suff_used_unknown.add(suffix.upper())
     return "other"
 
+# тип файлу за вмістом, якщо CONTENT_SNIFFING увімкнено і сигнатуру впізнано,
+# інакше - за розширенням
+def classify (file, stat = None):
+    if CONTENT_SNIFFING:
+        type = sniff (file, stat)
+        if type == ZIP_CONTAINER:
+            type = filetype (file.suffix)
+            return type if type != 'other' else 'archives'
+        if type:
+            suff_used_known.add (file.suffix.removeprefix ('.').upper())
+            return type
+    return filetype (file.suffix)
+
 # функція створення папок, в які розсортуємо, та видалення пустих
 # працює, якщо відповідаємо 'у' після першого прогону
 # action 'new' створює, action 'del' удаляє 
@@ -62,29 +89,70 @@ def work_with_directories (path_: Path, action):
 # функція власне сортування, параметр action - для другого прогону
 # з нормалізацією та переміщенням
 # перший прогон - тільки для інформації скільки і чого є 
-def sorting (path_, action = False):
+# progress (SortProgress) - необов'язковий облік файлів, байтів та категорій
+def sorting (path_, action = False, mover = None, progress = None):
+    if action and mover is None: # верхній рівень другого прогону
+        mover = Mover (MOVE_WORKERS, parse_rate (RATE_LIMIT))
+        sorting (path_, action, mover, progress)
+        summary = finish_moves (mover)
+        if progress:
+            progress.finish (transfer = summary)
+        return all_files
     for file in path_.iterdir(): #ім'я файлу з розширенням
         if file.is_dir():
             if action:
-                sorting (file, action = True) #рекурсуємо, якщо папка
-            else: sorting (file) #рекурсуємо, якщо папка
+                sorting (file, action = True, mover = mover, progress = progress) #рекурсуємо, якщо папка
+            else: sorting (file, progress = progress) #рекурсуємо, якщо папка
+        elif mover and mover.is_temporary (file):
+            continue # копія, яка ще пишеться
+        elif file.name == SUMMARY_NAME:
+            continue # підсумок попереднього запуску
         else:
-            all_files.append (filetype (file.suffix)) # список усіх типів
+            stat = file.stat() if CONTENT_SNIFFING or (progress and not action) else None
+            file_type = classify (file, stat)
+            all_files.append (file_type) # список усіх типів
 # нормалізую ім'я файлу та переміщую у відповідну папку
             if action: 
                 file_name_norm = f'{normalize (file.stem)}{file.suffix}'
-                file.replace (PATH / filetype (file.suffix) / file_name_norm)
-# а тут розпаковую архів
-                if filetype (file.suffix) == 'archives':
-                    shutil.unpack_archive (PATH / 'archives' / file_name_norm, 
-                                           PATH / 'archives' / file.stem)
+                target = PATH / file_type / file_name_norm
+                if target == file:
+                    continue # вже на своєму місці (папки категорій теж обходяться)
+                mover.move (file, target, partial (progress.advance, file_type) if progress else None)
+                if file_type == 'archives':
+                    archives_moved.append ((file, target, PATH / 'archives' / file.stem))
+            elif progress:
+                progress.advance (file_type, stat.st_size)
     return all_files
 
+# чекаємо копіювання між дисками, потім розпаковуємо архіви
+def finish_moves (mover):
+    failed = mover.finish ()
+    for file, error in failed.items():
+        print (f'Не вдалося перемістити {file}: {error}')
+    for file, archive, folder in archives_moved:
+        if file not in failed:
+            try:
+                shutil.unpack_archive (archive, folder)
+            except (shutil.ReadError, ValueError) as error: # напр. архів без розширення
+                print (f'Не вдалося розпакувати {archive}: {error}')
+    archives_moved.clear ()
+    summary = mover.summary ()
+    summary ['failed'] = [str (file) for file in failed]
+    if summary ['copied']:
+        speed = summary ['bytes_per_sec'] or 0
+        print (f"Скопійовано між дисками: {summary ['copied']} файлів, "
+               f"{summary ['bytes'] / 1024 ** 2:.1f} МБ за {summary ['copy_seconds']} с "
+               f"({speed / 1024 ** 2:.1f} МБ/с)")
+    return summary
+
 # функція із діалогами для коректної роботи як консольний скрипт
 def run (line):
     global PATH
     PATH = Path(line)
-    sorting (PATH)
+    progress = SortProgress ()
+    progress.start ('survey', 'Огляд папки')
+    sorting (PATH, progress = progress)
+    survey = progress.finish ()
 
 #вивід результатів першого прогону
     console = Console()
@@ -116,10 +184,18 @@ def run (line):
         print ('Дякую за увагу!\n')
     else:
         work_with_directories (PATH, 'new') # створюємо цільові папки
-        sorting (PATH, action = True) # нормалізуємо та переміщуємо файли
+        progress.start ('move', 'Переміщення', files = survey ['files'], size = survey ['bytes'])
+        sorting (PATH, action = True, progress = progress) # нормалізуємо та переміщуємо файли
         work_with_directories (PATH, 'del') # видаляємо усі пусті папки
         print ('Імена файлів нормалізовані. Файли перемещені у\
  відповідні папки.\n')
+    try:
+        summary_file = progress.write (PATH, known_suffixes = sorted (suff_used_known),
+                                       unknown_suffixes = sorted (suff_used_unknown))
+    except OSError as error: # файли вже переміщені - підсумок не варто того, щоб переривати роботу
+        print (f'Не вдалося записати підсумок запуску: {error}\n')
+    else:
+        print (f'Підсумок запуску записано у {summary_file}\n')
 # власне запуск
 if __name__ == '__main__':
     run()
\ No newline at end of file
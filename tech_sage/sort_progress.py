@@ -0,0 +1,84 @@
+"""
+Прогрес та підсумок для довгих запусків sort_files.
+
+Кожен етап (огляд папки, переміщення) показується рядком rich Progress:
+файли, байти, файлів/с, байтів/с, ETA (для переміщення, коли загальний
+обсяг відомий з огляду) та кількість файлів за категоріями. Після
+запуску підсумок пишеться у JSON всередині папки (поруч з папкою писати
+не можна для кореня диска, а батьківська папка може бути лише для читання):
+    <папка>/.sort_summary.json
+Інший шлях задається змінною оточення TECH_SAGE_SORT_SUMMARY.
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from rich.progress import (Progress, TextColumn, BarColumn, DownloadColumn,
+                           TransferSpeedColumn, TimeRemainingColumn)
+
+SUMMARY_NAME = '.sort_summary.json'   # sort_files не сортує цей файл
+
+
+class SortProgress:
+    def __init__(self, console=None):
+        self.console = console
+        self.stages = {}
+        self.started = datetime.now()
+        self.lock = threading.Lock()
+        self._progress = None
+        self._task = None
+        self._stage = None
+
+    def start(self, name, description, files=None, size=None):
+        """Починає етап; files та size - очікувані кількість файлів і обсяг, якщо відомі."""
+        self._stage = {'name': name, 'files': 0, 'bytes': 0, 'categories': {},
+                       'expected_files': files, 'started': time.perf_counter()}
+        self._progress = Progress(TextColumn('[bold]{task.description}'), BarColumn(bar_width=20),
+                                  TextColumn('{task.fields[files]} ф. ({task.fields[rate]:.0f} ф/с)'),
+                                  DownloadColumn(), TransferSpeedColumn(), TimeRemainingColumn(),
+                                  TextColumn('{task.fields[categories]}'),
+                                  console=self.console, transient=False)
+        self._task = self._progress.add_task(description, total=size, files=0, rate=0.0, categories='')
+        self._progress.start()
+
+    def advance(self, category, size):
+        """Один оброблений файл. Може викликатись з потоків копіювання."""
+        with self.lock:
+            stage = self._stage
+            stage['files'] += 1
+            stage['bytes'] += size
+            stage['categories'][category] = stage['categories'].get(category, 0) + 1
+            elapsed = time.perf_counter() - stage['started']
+            self._progress.update(self._task, advance=size, files=stage['files'],
+                                  rate=stage['files'] / elapsed if elapsed else 0.0,
+                                  categories=' '.join(f'{key}:{value}'
+                                                      for key, value in sorted(stage['categories'].items())))
+
+    def finish(self, **extra):
+        """Завершує етап; extra (напр. підсумок копіювання) додається у звіт."""
+        stage, self._stage = self._stage, None
+        if stage is None:
+            return None
+        self._progress.stop()
+        seconds = time.perf_counter() - stage.pop('started')
+        stage.update(seconds=round(seconds, 3),
+                     files_per_sec=round(stage['files'] / seconds, 1) if seconds else None,
+                     bytes_per_sec=round(stage['bytes'] / seconds) if seconds else None,
+                     **extra)
+        self.stages[stage.pop('name')] = stage
+        return stage
+
+    def summary(self, root, **extra):
+        return {'root': str(root), 'started': self.started.isoformat(timespec='seconds'),
+                'finished': datetime.now().isoformat(timespec='seconds'),
+                'stages': self.stages, **extra}
+
+    def write(self, root, **extra):
+        """Пише підсумок у TECH_SAGE_SORT_SUMMARY або <root>/.sort_summary.json і повертає шлях до файлу."""
+        root = root.resolve()
+        file = os.environ.get('TECH_SAGE_SORT_SUMMARY') or root / SUMMARY_NAME
+        with open(file, 'w', encoding='utf-8') as stream:
+            json.dump(self.summary(root, **extra), stream, ensure_ascii=False, indent=2)
+        return file
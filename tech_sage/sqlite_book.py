@@ -0,0 +1,364 @@
+"""
+Адресна книга у локальному файлі SQLite.
+
+SQLiteAddressBook має той самий інтерфейс, що й AddressBook
+(add_record, find, delete_record, find_by_term, iterator, dump, load),
+але не тримає всю книгу в пам'яті: записи читаються з бази на вимогу,
+а пошук виконується запитами по індексах (ім'я, телефон, e-mail,
+місяць/день народження) та повнотекстовим індексом FTS5 для нотаток.
+Індекс нотаток - триграмний, тож пошук, як і в AddressBook, знаходить
+підрядок, а не лише слово з початку (work знаходить homework).
+
+Зміни пишуться в базу одразу, але фіксуються (commit) лише у dump(),
+тому load() так само, як і для pickle, відкидає незбережені зміни.
+Записи, отримані через book[name] / book.get(name), кешуються і
+перезаписуються, якщо їх змінили на місці (record.add_phone і т.д.) -
+перед кожним пошуком у базі та у dump().
+"""
+import sqlite3
+from collections.abc import MutableMapping
+from pathlib import Path
+from typing import List
+
+from .main import Record, NoteRecord, Note, Phone, record_state
+from .metrics import METRICS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS contacts (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    name_lower TEXT NOT NULL,
+    kind INTEGER NOT NULL DEFAULT 1,
+    email TEXT,
+    address TEXT,
+    birthday TEXT,
+    bday_month INTEGER,
+    bday_day INTEGER
+);
+CREATE TABLE IF NOT EXISTS phones (
+    contact_id INTEGER NOT NULL REFERENCES contacts(id) ON DELETE CASCADE,
+    phone TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY,
+    contact_id INTEGER NOT NULL REFERENCES contacts(id) ON DELETE CASCADE,
+    text TEXT NOT NULL,
+    tags TEXT NOT NULL DEFAULT '',
+    date TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS contacts_name_lower ON contacts(name_lower);
+CREATE INDEX IF NOT EXISTS contacts_email_nocase ON contacts(email COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS contacts_bday ON contacts(bday_month, bday_day);
+CREATE INDEX IF NOT EXISTS phones_phone ON phones(phone);
+CREATE INDEX IF NOT EXISTS phones_contact ON phones(contact_id);
+CREATE INDEX IF NOT EXISTS notes_contact ON notes(contact_id);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(text, tags, content='notes', content_rowid='id', tokenize='trigram');
+CREATE TRIGGER IF NOT EXISTS notes_ai AFTER INSERT ON notes BEGIN
+    INSERT INTO notes_fts(rowid, text, tags) VALUES (new.id, new.text, new.tags);
+END;
+CREATE TRIGGER IF NOT EXISTS notes_ad AFTER DELETE ON notes BEGIN
+    INSERT INTO notes_fts(notes_fts, rowid, text, tags) VALUES ('delete', old.id, old.text, old.tags);
+END;
+"""
+
+CONTACT_COLUMNS = 'id, name, kind, email, address, birthday'
+
+
+def _tags_to_text(tags):
+    if not tags:
+        return ''
+    if isinstance(tags, str):
+        return tags
+    return ', '.join(tags)
+
+
+class SQLiteAddressBook(MutableMapping):
+    # з'єднання sqlite3 прив'язане до потоку, що його створив
+    thread_safe = False
+    # записи читаються з бази на вимогу, а не тримаються в пам'яті
+    in_memory = False
+
+    def __init__(self, file="adress_book_1.db"):
+        self.file = Path(file)
+        self.connection = sqlite3.connect(self.file)
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        self.connection.executescript(SCHEMA)
+        try:
+            self._upgrade_fts()
+            self.connection.executescript(FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            # sqlite без FTS5 - нотатки шукаються через LIKE
+            self.fts = False
+        self.connection.commit()
+        self._records = {}
+        self._fingerprints = {}
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'record_id'").fetchone()
+        self.record_id = int(row[0]) if row else 0
+
+    def _upgrade_fts(self):
+        # бази, створені до переходу на триграми, мають індекс за словами - перебудовуємо його
+        row = self.connection.execute("SELECT sql FROM sqlite_master WHERE name = 'notes_fts'").fetchone()
+        if row is None or 'trigram' in row[0]:
+            return
+        self.connection.executescript('DROP TRIGGER IF EXISTS notes_ai; DROP TRIGGER IF EXISTS notes_ad; '
+                                      'DROP TABLE notes_fts;')
+        self.connection.executescript(FTS_SCHEMA)
+        self.connection.execute("INSERT INTO notes_fts(notes_fts) VALUES ('rebuild')")
+
+    @property
+    def data(self):
+        return self
+
+    # --- читання записів ---
+
+    def _build(self, rows):
+        """Створює записи з рядків contacts, дочитуючи телефони та нотатки одним запитом на кожну таблицю."""
+        rows = list(rows)
+        if not rows:
+            return []
+        ids = [row[0] for row in rows]
+        placeholders = ','.join('?' * len(ids))
+        phones, notes = {}, {}
+        for contact_id, phone in self.connection.execute(
+                f'SELECT contact_id, phone FROM phones WHERE contact_id IN ({placeholders}) ORDER BY rowid', ids):
+            phones.setdefault(contact_id, []).append(phone)
+        for contact_id, text, tags, date in self.connection.execute(
+                f'SELECT contact_id, text, tags, date FROM notes WHERE contact_id IN ({placeholders}) ORDER BY id', ids):
+            notes.setdefault(contact_id, []).append(Note(text, date, tags))
+
+        records = []
+        for contact_id, name, kind, email, address, birthday in rows:
+            cached = self._records.get(name)
+            if cached is not None:
+                records.append(cached)
+                continue
+            record = NoteRecord(name) if kind else Record(name)
+            record.phones = [Phone(phone) for phone in phones.get(contact_id, [])]
+            if email:
+                record.add_email(email)
+            if address:
+                record.add_address(address)
+            if birthday:
+                record.add_birthday(birthday)
+            if kind:
+                record.notes = notes.get(contact_id, [])
+            records.append(record)
+        return records
+
+    def _query(self, where, params=(), batch=500):
+        cursor = self.connection.execute(f'SELECT {CONTACT_COLUMNS} FROM contacts {where}', params)
+        while True:
+            rows = cursor.fetchmany(batch)
+            if not rows:
+                return
+            yield from self._build(rows)
+
+    def __getitem__(self, name):
+        if name in self._records:
+            return self._records[name]
+        records = self._build(self.connection.execute(
+            f'SELECT {CONTACT_COLUMNS} FROM contacts WHERE name = ?', (name,)))
+        if not records:
+            raise KeyError(name)
+        record = records[0]
+        self._records[name] = record
+        self._fingerprints[name] = record_state(record)
+        return record
+
+    def __contains__(self, name):
+        if name in self._records:
+            return True
+        return self.connection.execute('SELECT 1 FROM contacts WHERE name = ?', (name,)).fetchone() is not None
+
+    def __iter__(self):
+        for (name,) in self.connection.execute('SELECT name FROM contacts ORDER BY id'):
+            yield name
+
+    def __len__(self):
+        return self.connection.execute('SELECT count(*) FROM contacts').fetchone()[0]
+
+    def values(self):
+        return self._query('ORDER BY id')
+
+    def items(self):
+        return ((record.name.value, record) for record in self._query('ORDER BY id'))
+
+    # --- запис ---
+
+    def _write(self, record):
+        name = record.name.value
+        birthday = record.birthday.value if record.birthday else None
+        month, day = (int(birthday[5:7]), int(birthday[8:10])) if birthday else (None, None)
+        self.connection.execute(
+            'INSERT INTO contacts (name, name_lower, kind, email, address, birthday, bday_month, bday_day) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT(name) DO UPDATE SET kind = excluded.kind, email = excluded.email, '
+            'address = excluded.address, birthday = excluded.birthday, '
+            'bday_month = excluded.bday_month, bday_day = excluded.bday_day',
+            (name, name.lower(), int(isinstance(record, NoteRecord)),
+             record.email.value if record.email else None,
+             record.address.value if record.address else None,
+             birthday, month, day))
+        contact_id = self.connection.execute('SELECT id FROM contacts WHERE name = ?', (name,)).fetchone()[0]
+        self.connection.execute('DELETE FROM phones WHERE contact_id = ?', (contact_id,))
+        self.connection.execute('DELETE FROM notes WHERE contact_id = ?', (contact_id,))
+        self.connection.executemany('INSERT INTO phones (contact_id, phone) VALUES (?, ?)',
+                                    [(contact_id, phone.value) for phone in record.phones])
+        self.connection.executemany('INSERT INTO notes (contact_id, text, tags, date) VALUES (?, ?, ?, ?)',
+                                    [(contact_id, note.value, _tags_to_text(note.tags), note.date)
+                                     for note in getattr(record, 'notes', ())])
+
+    def __setitem__(self, name, record):
+        self._write(record)
+        self._records[name] = record
+        self._fingerprints[name] = record_state(record)
+
+    def __delitem__(self, name):
+        cursor = self.connection.execute('DELETE FROM contacts WHERE name = ?', (name,))
+        self._records.pop(name, None)
+        self._fingerprints.pop(name, None)
+        if not cursor.rowcount:
+            raise KeyError(name)
+
+    def add_record(self, record):
+        self[record.name.value] = record
+
+    def touch(self, name):
+        # змінені записи знаходяться порівнянням відбитків у dump()
+        pass
+
+    def add_records(self, records):
+        # пакет пишеться без кешування записів, щоб імпорт не тримав їх у пам'яті
+        with METRICS.timed('book.add_records') as timing:
+            for record in records:
+                self._write(record)
+                self._records.pop(record.name.value, None)
+                self._fingerprints.pop(record.name.value, None)
+            timing.records = len(records)
+
+    def find(self, term):
+        if term in self._records:
+            return self._records[term]
+        records = self._build(self.connection.execute(
+            f'SELECT {CONTACT_COLUMNS} FROM contacts WHERE name = ?', (term,)))
+        return records[0] if records else None
+
+    def delete_record(self, name):
+        if name.name.value in self:
+            del self[name.name.value]
+
+    def iterator(self, item_number):
+        result = []
+        for record in self.values():
+            result.append(record)
+            if len(result) >= item_number:
+                yield result
+                result = []
+
+    def _flush(self):
+        """
+        Записує в базу (без commit) кешовані записи, змінені на місці. Викликається
+        перед кожним пошуком у базі, щоб він бачив ті самі дані, що й AddressBook.
+        Повертає кількість записаних записів.
+        """
+        written = 0
+        for name, record in self._records.items():
+            fingerprint = record_state(record)
+            if fingerprint != self._fingerprints.get(name):
+                self._write(record)
+                self._fingerprints[name] = fingerprint
+                written += 1
+        return written
+
+    def dump(self):
+        with METRICS.timed('book.dump') as timing:
+            timing.records = self._flush()
+            self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('record_id', ?)",
+                                    (str(self.record_id),))
+            self.connection.commit()
+
+    def load(self):
+        with METRICS.timed('book.load'):
+            self.connection.rollback()
+            self._records.clear()
+            self._fingerprints.clear()
+
+    # --- пошук ---
+
+    def find_by_term(self, term: str) -> List[Record]:
+        with METRICS.timed('book.find_by_term') as timing:
+            self._flush()
+            records = list(self._query(
+                'WHERE instr(name_lower, ?) > 0 OR instr(email, ?) > 0 OR instr(address, ?) > 0 '
+                'OR id IN (SELECT contact_id FROM phones WHERE instr(phone, ?) > 0) ORDER BY id',
+                (term.lower(), term, term, term)))
+            # база відбирає рядки сама - прочитано лише знайдені записи
+            timing.records = len(records)
+        return records
+
+    # пошук імен за індексами - для планувальника query (DatabaseIndex)
+
+    def names_by_name_prefix(self, prefix):
+        self._flush()
+        # діапазон [prefix, prefix + максимальний символ) використовує індекс contacts_name_lower
+        return {name for (name,) in self.connection.execute(
+            'SELECT name FROM contacts WHERE name_lower >= ? AND name_lower < ?', (prefix, prefix + '\uffff'))}
+
+    def names_by_phone_prefix(self, prefix, exact=False):
+        self._flush()
+        if exact:
+            rows = self.connection.execute(
+                'SELECT c.name FROM phones p JOIN contacts c ON c.id = p.contact_id WHERE p.phone = ?', (prefix,))
+        else:
+            rows = self.connection.execute(
+                'SELECT c.name FROM phones p JOIN contacts c ON c.id = p.contact_id '
+                'WHERE p.phone >= ? AND p.phone < ?', (prefix, prefix + '\uffff'))
+        return {name for (name,) in rows}
+
+    def names_by_email(self, email):
+        self._flush()
+        return {name for (name,) in self.connection.execute(
+            'SELECT name FROM contacts WHERE email = ? COLLATE NOCASE', (email,))}
+
+    def find_by_birthday(self, month, day):
+        self._flush()
+        return list(self._query('WHERE bday_month = ? AND bday_day = ? ORDER BY id', (month, day)))
+
+    def names_by_birthday(self, month, day):
+        self._flush()
+        return {name for (name,) in self.connection.execute(
+            'SELECT name FROM contacts WHERE bday_month = ? AND bday_day = ?', (month, day))}
+
+    def find_notes_by_term(self, term):
+        """Повертає список (ім'я, нотатка) для нотаток, у тексті або тегах яких є term."""
+        with METRICS.timed('book.find_notes_by_term') as timing:
+            notes, timing.records = self._find_notes_by_term(term)
+        return notes
+
+    def _find_notes_by_term(self, term):
+        needle = term.lower()
+        if not needle:
+            return [], 0
+        self._flush()
+        # триграмний індекс працює для підрядків від 3 символів, коротші шукаються перебором
+        if self.fts and len(needle) >= 3:
+            rows = self.connection.execute(
+                'SELECT c.name, n.text, n.tags, n.date FROM notes_fts f '
+                'JOIN notes n ON n.id = f.rowid JOIN contacts c ON c.id = n.contact_id '
+                'WHERE notes_fts MATCH ? ORDER BY n.id', ('"{}"'.format(needle.replace('"', '""')),))
+        else:
+            rows = self.connection.execute(
+                'SELECT c.name, n.text, n.tags, n.date FROM notes n JOIN contacts c ON c.id = n.contact_id '
+                'ORDER BY n.id')
+        rows = rows.fetchall()
+        # остаточна перевірка - тими ж правилами регістру, що й NoteRecord.find_notes_by_term
+        return [(name, Note(text, date, tags)) for name, text, tags, date in rows
+                if needle in text.lower() or needle in tags.lower()], len(rows)
+
+    def close(self):
+        self.connection.close()
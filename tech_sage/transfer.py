@@ -0,0 +1,214 @@
+"""
+Переміщення файлів для sort_files, у тому числі між файловими системами.
+
+Path.replace (rename) працює лише в межах однієї файлової системи
+(інакше - OSError EXDEV). Mover порівнює st_dev файлу та папки
+призначення: на одному пристрої файл просто перейменовується, інакше
+копіюється у пулі потоків (не більше WORKERS одночасно) і видаляється
+лише після перевірки розміру копії. Копіювання йде через
+os.copy_file_range, а якщо ядро чи файлова система його не підтримує -
+через os.sendfile; дані при цьому не проходять через простір
+користувача. Останній запасний варіант - звичайне читання блоками.
+
+Копія пишеться у тимчасовий файл *.tspart поруч з місцем призначення
+і перейменовується після перевірки, тож перерване копіювання не
+залишає обрізаних файлів. Необов'язковий TokenBucket обмежує
+швидкість копіювання, щоб диск залишався доступним іншим програмам.
+"""
+import errno
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+CHUNK = 8 * 1024 * 1024
+WORKERS = 4
+PART_SUFFIX = '.tspart'
+UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+# помилки, при яких швидкий спосіб копіювання просто недоступний
+UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF}
+
+
+def parse_rate(text):
+    """'50M' -> 52428800 байт/с; порожній рядок або None - без обмеження."""
+    if not text:
+        return None
+    text = str(text).strip().upper().removesuffix('B').removesuffix('/S')
+    unit = text[-1:] if text[-1:] in UNITS else ''
+    try:
+        rate = float(text[:len(text) - len(unit)]) * UNITS[unit]
+    except ValueError:
+        raise ValueError(f"Некоректне обмеження швидкості '{text}', очікується напр. 50M")
+    return rate if rate > 0 else None
+
+
+class TokenBucket:
+    """
+    Обмеження швидкості rate байт/с із запасом burst байт: consume(n) чекає,
+    доки не накопичиться квота на n байтів. Кожен виклик резервує свій
+    проміжок часу, тож потоки не чекають за чужі байти. Квота
+    списується після запису блоку, тож невдала спроба швидкого способу
+    копіювання її не витрачає.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = (burst or rate) / rate     # запас у секундах
+        self.ready = time.monotonic()           # коли квота буде повністю вичерпана
+        self.lock = threading.Lock()
+
+    def consume(self, amount):
+        with self.lock:
+            now = time.monotonic()
+            self.ready = max(self.ready, now) + amount / self.rate
+            wait = self.ready - now - self.burst
+        if wait > 0:
+            time.sleep(wait)
+
+
+def _copy_file_range(src, dst, size, limiter):
+    copied = 0
+    while copied < size:
+        sent = os.copy_file_range(src.fileno(), dst.fileno(), min(CHUNK, size - copied), copied, copied)
+        if not sent:
+            break
+        copied += sent
+        if limiter:
+            limiter.consume(sent)
+    return copied
+
+
+def _sendfile(src, dst, size, limiter):
+    copied = 0
+    while copied < size:
+        sent = os.sendfile(dst.fileno(), src.fileno(), copied, min(CHUNK, size - copied))
+        if not sent:
+            break
+        copied += sent
+        if limiter:
+            limiter.consume(sent)
+    return copied
+
+
+def _buffered(src, dst, size, limiter):
+    copied = 0
+    while True:
+        chunk = src.read(CHUNK)
+        if not chunk:
+            return copied
+        dst.write(chunk)
+        copied += len(chunk)
+        if limiter:
+            limiter.consume(len(chunk))
+
+
+COPY_METHODS = [method for name, method in (('copy_file_range', _copy_file_range), ('sendfile', _sendfile))
+                if hasattr(os, name)] + [_buffered]
+
+
+def copy_file(source, target, limiter=None):
+    """Копіює вміст та метадані source у target. Повертає кількість байтів."""
+    size = os.stat(source).st_size
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        for method in COPY_METHODS:
+            try:
+                copied = method(src, dst, size, limiter)
+                break
+            except OSError as e:
+                # переходимо до наступного способу, лише якщо ще нічого не записано
+                if e.errno not in UNSUPPORTED or dst.tell() or os.fstat(dst.fileno()).st_size:
+                    raise
+    try:
+        shutil.copystat(source, target)
+    except OSError:
+        # vfat, CIFS та інші змонтовані томи можуть не дозволяти змінювати права чи час -
+        # дані вже скопійовано, тож переміщення не скасовується
+        pass
+    return copied
+
+
+class Mover:
+    def __init__(self, workers=WORKERS, rate=None):
+        self.workers = workers
+        self.limiter = TokenBucket(rate) if rate else None
+        self.slots = threading.BoundedSemaphore(workers * 2)   # не більше стількох копіювань у черзі
+        self.lock = threading.Lock()
+        self.devices = {}       # папка -> st_dev
+        self.pending = []       # (файл, future) копіювань між пристроями
+        self.renamed = 0
+        self.copied = 0
+        self.bytes = 0
+        self.started = None     # час першого копіювання
+        self.elapsed = 0.0      # від першого копіювання до завершення всіх
+        self._executor = None
+
+    @staticmethod
+    def is_temporary(path):
+        return path.name.endswith(PART_SUFFIX)
+
+    def _device(self, folder):
+        if folder not in self.devices:
+            self.devices[folder] = os.stat(folder).st_dev
+        return self.devices[folder]
+
+    def move(self, source, target, on_done=None):
+        """
+        Переміщує source у target: перейменуванням одразу або копіюванням у фоні.
+        on_done(розмір) викликається після успішного переміщення (можливо, з потоку пулу).
+        """
+        stat = source.stat()
+        if stat.st_dev == self._device(target.parent):
+            try:
+                source.replace(target)
+                self.renamed += 1
+                if on_done:
+                    on_done(stat.st_size)
+                return
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers)
+            self.started = time.perf_counter()
+        self.slots.acquire()
+        future = self._executor.submit(self._copy_move, source, target, on_done)
+        future.add_done_callback(lambda _: self.slots.release())
+        self.pending.append((source, future))
+
+    def _copy_move(self, source, target, on_done):
+        temp = target.with_name(target.name + PART_SUFFIX)
+        try:
+            size = copy_file(source, temp, self.limiter)
+            if os.stat(temp).st_size != os.stat(source).st_size:
+                raise OSError(errno.EIO, 'розмір копії не збігається з оригіналом', str(source))
+            os.replace(temp, target)
+        except BaseException:
+            temp.unlink(missing_ok=True)
+            raise
+        source.unlink()
+        with self.lock:
+            self.copied += 1
+            self.bytes += size
+        if on_done:
+            on_done(size)
+
+    def finish(self):
+        """Чекає завершення всіх копіювань. Повертає {файл: помилка} для невдалих."""
+        failed = {}
+        for source, future in self.pending:
+            error = future.exception()
+            if error is not None:
+                failed[source] = error
+        self.pending.clear()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+            self.elapsed = time.perf_counter() - self.started
+        return failed
+
+    def summary(self):
+        return {'renamed': self.renamed, 'copied': self.copied, 'bytes': self.bytes,
+                'copy_seconds': round(self.elapsed, 3),
+                'bytes_per_sec': round(self.bytes / self.elapsed) if self.elapsed else None}
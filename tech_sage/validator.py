@@ -0,0 +1,110 @@
+from prompt_toolkit.validation import Validator, ValidationError
+
+
+class CommandValidator(Validator):
+    def validate(self, document):
+        text = document.text
+        if text.startswith("add_phone"):
+            x = text.strip().split(" ")
+            if len(x) < 2:
+                raise ValidationError(message="Введіть: <Ім'я>", cursor_position=len(text))
+
+        if text.startswith("delete_phone"):
+            x = text.strip().split(" ")
+            if len(x) < 2:
+                raise ValidationError(message="Введіть: <Ім'я>", cursor_position=len(text))
+
+        if text.startswith("add_birthday"):
+            x = text.strip().split(" ")
+            if len(x) < 2:
+                raise ValidationError(message="Введіть: <Ім'я>", cursor_position=len(text))
+
+        if text.startswith("find_record_by_trem"):
+            x = text.split(" ")
+            if len(x) == 1:
+                raise ValidationError(message="Введіть: будь який термін для пошуку", cursor_position=len(text))
+
+        if text.startswith("days_to_birthday"):
+            x = text.strip().split(" ")
+            if len(x) < 2:
+                raise ValidationError(message="Введіть: <Ім'я> для пошуку", cursor_position=len(text))
+
+        if text.startswith("when"):
+            x = text.strip().split(" ")
+            if len(x) < 2:
+                raise ValidationError(message="Введіть: кількість днів для пошуку", cursor_position=len(text))
+
+        if text.startswith("sort_files"):
+            x = text.strip().split(" ")
+            if len(x) != 2:
+                raise ValidationError(message="Введіть: шлях до папки, яку треба сортувати", cursor_position=len(text))
+
+        if text.startswith("import"):
+            x = text.strip().split(" ")
+            if len(x) < 2:
+                raise ValidationError(message="Введіть: шлях до файлу (.csv, .jsonl, .vcf)", cursor_position=len(text))
+
+        if text.startswith("export"):
+            x = text.strip().split(" ")
+            if len(x) < 2:
+                raise ValidationError(message="Введіть: шлях до файлу (.csv, .jsonl, .vcf, .ics)", cursor_position=len(text))
+
+        if text.startswith("query"):
+            x = text.strip().split(" ")
+            if len(x) < 2:
+                raise ValidationError(message="Введіть: умови пошуку, напр. phone:067* tag:work birthday<30d", cursor_position=len(text))
+
+        if text.startswith("checkout"):
+            x = text.strip().split(" ")
+            if len(x) < 2:
+                raise ValidationError(message="Введіть: час, напр. 14:30 або 2024-01-31 14:30:00", cursor_position=len(text))
+
+        if text.startswith("profile"):
+            x = text.strip().split(" ")
+            if len(x) < 2:
+                raise ValidationError(message="Введіть: команду, яку треба профілювати", cursor_position=len(text))
+
+        if text.startswith("add_note"):
+            x = text.strip().split(" ")
+            if len(x) < 2:
+                raise ValidationError(message="Введіть: <Ім'я>", cursor_position=len(text))
+
+        if text.startswith("find_note_by_name"):
+            x = text.strip().split(" ")
+            if len(x) < 2:
+                raise ValidationError(message="Введіть: <Ім'я> для пошуку", cursor_position=len(text))
+            
+        if text.startswith("find_notes_by_term"):
+            x = text.split(" ")
+            if len(x) != 2:
+                raise ValidationError(message="Введіть: текст для пошуку", cursor_position=len(text))
+            
+        if text.startswith("edit_note"):
+            x = text.strip().split(" ")
+            if len(x) < 2:
+                raise ValidationError(message="Введіть: <Ім'я>", cursor_position = len(text))
+            
+        if text.startswith("delete_all_notes"):
+            x = text.strip().split(" ")
+            if len(x) < 2:
+                raise ValidationError(message="Введіть: <Ім'я>", cursor_position=len(text))
+
+        if text.startswith("add_email"):
+            x = text.strip().split(" ")
+            if len(x) < 2:
+                raise ValidationError(message="Введіть: <Ім'я>", cursor_position=len(text))
+
+        if text.startswith("delete_email"):
+            x = text.strip().split(" ")
+            if len(x) < 2:
+                raise ValidationError(message="Введіть: <Ім'я>", cursor_position=len(text))
+
+        if text.startswith("add_address"):
+            x = text.strip().split(" ")
+            if len(x) < 2:
+                raise ValidationError(message="Введіть: <Ім'я>", cursor_position=len(text))
+
+        if text.startswith("delete_address"):
+            x = text.strip().split(" ")
+            if len(x) < 2:
+                raise ValidationError(message="Введіть: <Ім'я>", cursor_position=len(text))